@@ -0,0 +1,122 @@
+"""
+Benchmark: the three-model path against shared scheduling and a fused
+multi-task model.
+
+Modes:
+    separate  sentiment, emotion and NER called one after another (the
+              current path: three tokenizations, three models).
+    shared    sentiment_analyser.analyse_batch with the same three models
+              (one scheduling pass; tokenization shared where vocabularies match).
+    fused     analyse_batch with a multi-task model (one encoder pass).
+
+Each mode runs in its own process, so its peak memory is measured alone.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_multitask --docs 200 --words 120
+    python -m benchmarks.bench_multitask --multitask path/to/multitask-model
+
+To time the fused path before a fine-tuned model exists, write one with
+untrained heads (its outputs are meaningless, its cost is representative):
+
+    python -m benchmarks.bench_multitask --build-heads distilroberta-base /tmp/multitask
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from benchmarks.run_benchmarks import fixture_corpus, peak_rss_mb, synthetic_corpus
+
+HEADS = {
+    'sentiment': {'labels': ['NEGATIVE', 'POSITIVE'], 'level': 'sequence'},
+    'emotion': {'labels': ['anger', 'disgust', 'fear', 'joy', 'neutral', 'sadness', 'surprise'], 'level': 'sequence'},
+    'ner': {'labels': ['O', 'B-MISC', 'I-MISC', 'B-PER', 'I-PER', 'B-ORG', 'I-ORG', 'B-LOC', 'I-LOC'], 'level': 'token'},
+}
+
+def build_heads(encoder, path):
+    from models.multitask import create_multitask, save_multitask
+
+    model, tokenizer = create_multitask(encoder, HEADS)
+    save_multitask(model, tokenizer, path)
+    print(f"Wrote a multi-task model with untrained heads to {path}")
+
+def run_mode(mode, texts, batch_size):
+    """Runs in the child process; returns one result row."""
+    from models import model_registry
+    from models import sentiment_analyser
+    from models.result_cache import ResultCache
+
+    # A disabled cache, so every pass runs the models.
+    sentiment_analyser.set_result_cache(ResultCache(max_entries=0))
+    started = time.perf_counter()
+    if mode == 'fused':
+        model_registry.multitask_tasks()
+    model_registry.warm_up(background=False)
+    load_seconds = time.perf_counter() - started
+
+    if mode == 'separate':
+        def run(batch):
+            sentiment_analyser.sentiment_scores_batch(batch, batch_size)
+            sentiment_analyser.emotion_scores_batch(batch, batch_size)
+            sentiment_analyser.recognize_entities_batch(batch, batch_size)
+    else:
+        def run(batch):
+            sentiment_analyser.analyse_batch(batch, batch_size=batch_size)
+
+    run(texts[:1])
+    started = time.perf_counter()
+    run(texts)
+    seconds = time.perf_counter() - started
+    return {
+        'mode': mode,
+        'docs': len(texts),
+        'load_seconds': load_seconds,
+        'seconds': seconds,
+        'docs_per_s': len(texts) / seconds if seconds else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the three-model path with shared and fused multi-task analysis')
+    parser.add_argument('--docs', type=int, default=100, help='Synthetic documents (0 for the fixture reviews)')
+    parser.add_argument('--words', type=int, default=120, help='Words per synthetic document')
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--multitask', help='Multi-task model directory for the fused mode')
+    parser.add_argument('--build-heads', nargs=2, metavar=('ENCODER', 'PATH'), help='Write a multi-task model with untrained heads and exit')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--mode', choices=['separate', 'shared', 'fused'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.build_heads:
+        build_heads(*args.build_heads)
+        return
+    texts = synthetic_corpus(args.docs, args.words) if args.docs else fixture_corpus()
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, texts, args.batch_size)))
+        return
+
+    modes = ['separate', 'shared'] + (['fused'] if args.multitask else [])
+    rows = []
+    for mode in modes:
+        env = dict(os.environ)
+        env.pop('ASAT_MULTITASK_MODEL', None)
+        if mode == 'fused':
+            env['ASAT_MULTITASK_MODEL'] = args.multitask
+        command = [sys.executable, '-m', 'benchmarks.bench_multitask', '--mode', mode,
+                   '--docs', str(args.docs), '--words', str(args.words), '--batch-size', str(args.batch_size)]
+        output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+        rows.append(json.loads(output.strip().splitlines()[-1]))
+
+    baseline = rows[0]['seconds']
+    print(f"{'mode':<10}{'docs/s':>10}{'seconds':>10}{'speed-up':>10}{'load s':>9}{'rss MB':>9}")
+    for row in rows:
+        print(f"{row['mode']:<10}{row['docs_per_s']:>10.1f}{row['seconds']:>10.2f}{baseline / row['seconds']:>9.2f}x"
+              f"{row['load_seconds']:>9.1f}{row['peak_rss_mb']:>9.0f}")
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'results': rows}, file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Micro-benchmark: compiled preprocessing pipeline vs. the original
+MainWindow.preprocess_text implementation.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_preprocessing --docs 2000 --repeat 3
+"""
+import argparse
+import random
+import re
+import time
+from nltk.corpus import stopwords
+from nltk.tokenize import word_tokenize
+from nltk.stem import WordNetLemmatizer
+import contractions
+from models.preprocessing import DEFAULT_OPTIONS, ensure_nltk_data, build_preprocessor, preprocess_batch
+
+WORDS = ("the product works great but I can't believe the battery died after 3 days "
+         "it's not what we expected @seller #fail https://example.com/item?id=42 www.shop.com "
+         "running runs ran better best cats geese mice loved hated won't shouldn't").split()
+
+# Tokens that run into each other, where a merged URL and mention/hashtag
+# pattern would differ from the sequential passes.
+EDGE_CASES = [
+    'mail john@www.example.com now',
+    'follow @httpie',
+    '@whttp://x.io ok',
+    '#tag#https://a.b/c end',
+    'price 12@wwwx and#1https://x.io',
+]
+
+def legacy_preprocess(text, options):
+    """The pre-compilation implementation, kept here as the benchmark baseline."""
+    if options['remove_urls']:
+        text = re.sub(r'http\S+|www\S+|https\S+', '', text, flags=re.MULTILINE)
+    if options['remove_mentions']:
+        text = re.sub(r'@\w+', '', text)
+    if options['remove_hashtags']:
+        text = re.sub(r'#\w+', '', text)
+    if options['remove_numbers']:
+        text = re.sub(r'\d+', '', text)
+    if options['expand_contractions']:
+        text = contractions.fix(text)
+    if options['remove_punctuation']:
+        text = re.sub(r'[^\w\s]', '', text)
+    if options['convert_to_lowercase']:
+        text = text.lower()
+    if options['remove_stopwords']:
+        stop_words = set(stopwords.words('english'))
+        text = ' '.join([word for word in text.split() if word.lower() not in stop_words])
+    if options['remove_whitespace']:
+        text = ' '.join(text.split())
+    if options['lemmatization']:
+        lemmatizer = WordNetLemmatizer()
+        text = ' '.join([lemmatizer.lemmatize(word) for word in word_tokenize(text)])
+    return text
+
+def synthetic_corpus(docs, words_per_doc, seed=0):
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(WORDS) for _ in range(words_per_doc)) for _ in range(docs)]
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--docs', type=int, default=2000)
+    parser.add_argument('--words', type=int, default=80)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    ensure_nltk_data()
+    corpus = synthetic_corpus(args.docs, args.words)
+    cases = {
+        'all options': {option: True for option in DEFAULT_OPTIONS},
+        'regex only': {'remove_urls': True, 'remove_mentions': True, 'remove_hashtags': True,
+                       'remove_numbers': True, 'remove_punctuation': True, 'convert_to_lowercase': True},
+        'stopwords + lemmatisation': {'remove_stopwords': True, 'lemmatization': True},
+    }
+    print(f"{'case':<28}{'legacy s':>10}{'compiled s':>12}{'speed-up':>10}")
+    for name, options in cases.items():
+        options = {**DEFAULT_OPTIONS, **options}
+        preprocess = build_preprocessor(options)
+        mismatches = sum(legacy_preprocess(text, options) != preprocess(text) for text in corpus + EDGE_CASES)
+        legacy = best_of(args.repeat, lambda: [legacy_preprocess(text, options) for text in corpus])
+        compiled = best_of(args.repeat, lambda: preprocess_batch(corpus, options))
+        note = f"  ({mismatches} outputs differ)" if mismatches else ''
+        print(f"{name:<28}{legacy:>10.3f}{compiled:>12.3f}{legacy / compiled:>9.1f}x{note}")
+
+if __name__ == "__main__":
+    main()
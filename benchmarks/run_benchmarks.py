@@ -0,0 +1,225 @@
+"""
+Benchmark suite for the analysis pipeline.
+
+Measures throughput (docs/s, tokens/s), per-document latency percentiles and
+peak memory for preprocessing, chunking, each model and report generation,
+over the fixture corpus and synthetic corpora of increasing document length.
+Each stage runs in its own process, so its peak memory is measured alone.
+
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks --output baseline.json
+    python -m benchmarks.run_benchmarks --output current.json --compare baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from models import profiling
+from models.preprocessing import preprocess_batch
+from models.result_cache import ResultCache
+from models import sentiment_analyser
+from models.sentiment_analyser import (
+    analyse_sentiment_batch, detect_emotion_batch, recognize_entities_batch,
+    generate_pdf_report, generate_excel_report,
+)
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'reviews.txt')
+SYNTHETIC_LENGTHS = {'short': 30, 'medium': 300, 'long': 2000}
+PREPROCESSING = {'remove_urls': True, 'remove_mentions': True, 'remove_hashtags': True, 'remove_whitespace': True}
+TASKS = {
+    'sentiment': analyse_sentiment_batch,
+    'emotion': detect_emotion_batch,
+    'ner': recognize_entities_batch,
+}
+REPORTS = {
+    'report.pdf': (generate_pdf_report, 'report.pdf'),
+    'report.excel': (generate_excel_report, 'report.xlsx'),
+}
+
+def fixture_corpus():
+    with open(FIXTURE, 'r') as file:
+        return [line.strip() for line in file if line.strip()]
+
+def synthetic_corpus(docs, words_per_doc, seed=0):
+    """Documents built by resampling words from the fixture reviews."""
+    rng = random.Random(seed)
+    words = ' '.join(fixture_corpus()).split()
+    return [' '.join(rng.choice(words) for _ in range(words_per_doc)) for _ in range(docs)]
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere.
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+def measure(corpus, stage, texts, run, latency_samples):
+    """
+    Time one pass over the whole corpus, then per-document calls on a sample.
+
+    Returns:
+        tuple: (row, stage_stats()) with the profiling hooks snapshotted right
+        after the full pass, before the latency samples add to them.
+    """
+    profiling.reset_stats()
+    started = time.perf_counter()
+    run(texts)
+    seconds = time.perf_counter() - started
+    stats = profiling.stage_stats()
+    # The chunking hook counts the tokens the models saw during the full pass.
+    tokens = stats.get(f'chunk_text.{stage}', {}).get('tokens', 0)
+    latencies = []
+    for text in texts[:latency_samples]:
+        started = time.perf_counter()
+        run([text])
+        latencies.append(time.perf_counter() - started)
+    row = {
+        'corpus': corpus,
+        'stage': stage,
+        'docs': len(texts),
+        'tokens': tokens,
+        'seconds': seconds,
+        'docs_per_s': len(texts) / seconds if seconds else 0.0,
+        'tokens_per_s': tokens / seconds if seconds else 0.0,
+        'p50_ms': profiling.percentile(latencies, 0.50) * 1000,
+        'p95_ms': profiling.percentile(latencies, 0.95) * 1000,
+        'p99_ms': profiling.percentile(latencies, 0.99) * 1000,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    return row, stats
+
+def stage_rows(corpus, stats):
+    """Rows for the chunking, forward-pass and aggregation hooks inside the analyser."""
+    return [
+        {
+            'corpus': corpus,
+            'stage': name,
+            'docs': entry['items'],
+            'tokens': entry['tokens'],
+            'seconds': entry['seconds'],
+            'docs_per_s': entry['items_per_second'],
+            'tokens_per_s': entry['tokens_per_second'],
+            'p50_ms': entry['p50_ms'],
+            'p95_ms': entry['p95_ms'],
+            'p99_ms': entry['p99_ms'],
+            'peak_rss_mb': peak_rss_mb(),
+        }
+        for name, entry in stats.items() if name.split('.')[0] in ('chunk_text', 'model', 'aggregate')
+    ]
+
+def corpus_texts(corpus, docs):
+    texts = fixture_corpus() if corpus == 'fixture' else synthetic_corpus(docs, SYNTHETIC_LENGTHS[corpus])
+    return preprocess_batch(texts, PREPROCESSING)
+
+def run_stage(corpus, stage, texts, latency_samples, data=None):
+    """
+    Runs in the child process; measures one stage.
+
+    Returns:
+        tuple: (rows, sample) where sample is a task's result for the first
+        document, used to build the report stages' input.
+    """
+    baseline = peak_rss_mb()
+    sample = None
+    if stage == 'preprocess':
+        rows = [measure(corpus, stage, texts, lambda batch: preprocess_batch(batch, PREPROCESSING), latency_samples)[0]]
+    elif stage in TASKS:
+        run = TASKS[stage]
+        # A disabled cache, so repeated passes measure the models rather than lookups.
+        sentiment_analyser.set_result_cache(ResultCache(max_entries=0))
+        # The first call loads the model; it is kept out of the timings but not out of the peak memory.
+        sample = run(texts[:1])[0]
+        row, stats = measure(corpus, stage, texts, run, latency_samples)
+        rows = [row] + stage_rows(corpus, stats)
+    else:
+        generate, name = REPORTS[stage]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, name)
+            rows = [measure(corpus, stage, [data], lambda batch: [generate(item, path) for item in batch], 0)[0]]
+    for row in rows:
+        # Memory after imports, before the stage; peak_rss_mb minus this is the stage's own footprint.
+        row['baseline_rss_mb'] = baseline
+    return rows, sample
+
+def run_corpus(corpus, args):
+    """Run each stage in its own process, so its peak memory is measured alone."""
+    rows = []
+    samples = {}
+    for stage in ['preprocess', *args.tasks, *REPORTS]:
+        data = None
+        if stage in REPORTS:
+            data = {
+                'sentiment': samples.get('sentiment'),
+                'emotions': {emotion['label']: emotion['score'] for emotion in samples.get('emotion') or []},
+                'entities': samples.get('ner') or [],
+            }
+        command = [sys.executable, '-m', 'benchmarks.run_benchmarks', '--stage', stage, '--corpora', corpus,
+                   '--docs', str(args.docs), '--latency-samples', str(args.latency_samples)]
+        output = subprocess.run(command, input=json.dumps(data), check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        rows.extend(result['rows'])
+        samples[stage] = result['sample']
+    return rows
+
+def compare(rows, baseline_path, threshold):
+    """Print throughput and p95 changes against a previous run; return the regressions."""
+    with open(baseline_path, 'r') as file:
+        baseline = {(row['corpus'], row['stage']): row for row in json.load(file)['results']}
+    regressions = []
+    print(f"\n{'corpus':<10}{'stage':<22}{'docs/s':>12}{'p95':>12}")
+    for row in rows:
+        previous = baseline.get((row['corpus'], row['stage']))
+        if not previous or not previous['docs_per_s'] or not previous['p95_ms']:
+            continue
+        throughput = row['docs_per_s'] / previous['docs_per_s'] - 1
+        latency = row['p95_ms'] / previous['p95_ms'] - 1 if row['p95_ms'] else 0.0
+        flag = ''
+        if throughput < -threshold or latency > threshold:
+            flag = '  REGRESSION'
+            regressions.append(row)
+        print(f"{row['corpus']:<10}{row['stage']:<22}{throughput:>+11.1%}{latency:>+11.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the analysis pipeline')
+    parser.add_argument('--corpora', nargs='+', default=['fixture', *SYNTHETIC_LENGTHS])
+    parser.add_argument('--docs', type=int, default=64, help='Documents per synthetic corpus')
+    parser.add_argument('--tasks', nargs='+', choices=list(TASKS), default=list(TASKS))
+    parser.add_argument('--latency-samples', type=int, default=20, help='Documents timed one at a time for percentiles')
+    parser.add_argument('--output', help='Write machine-readable results to this JSON file')
+    parser.add_argument('--compare', help='Previous results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Relative change reported as a regression')
+    parser.add_argument('--stage', choices=['preprocess', *TASKS, *REPORTS], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stage:
+        data = json.loads(sys.stdin.read() or 'null')
+        rows, sample = run_stage(args.corpora[0], args.stage, corpus_texts(args.corpora[0], args.docs),
+                                 args.latency_samples, data)
+        print(json.dumps({'rows': rows, 'sample': sample}))
+        return
+
+    rows = []
+    for corpus in args.corpora:
+        rows.extend(run_corpus(corpus, args))
+
+    print(f"{'corpus':<10}{'stage':<22}{'docs/s':>10}{'tokens/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'rss MB':>9}")
+    for row in rows:
+        print(f"{row['corpus']:<10}{row['stage']:<22}{row['docs_per_s']:>10.1f}{row['tokens_per_s']:>11.0f}"
+              f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['peak_rss_mb']:>9.0f}")
+
+    if args.output:
+        meta = {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        with open(args.output, 'w') as file:
+            json.dump({'meta': meta, 'results': rows}, file, indent=2)
+    if args.compare and compare(rows, args.compare, args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import argparse
+import sys
+from models.preprocessing import DEFAULT_OPTIONS
+
+PARITY_SAMPLES = [
+    "I absolutely love this product, it works perfectly.",
+    "Terrible experience. The package arrived late and broken.",
+    "Apple released the new iPhone in California last September.",
+    "It's okay, nothing special, but Amazon support was helpful.",
+]
+
+def analyse_command(args):
+    from models.batch_runner import run_batch
+    from models.result_store import ResultStore
+
+    store = ResultStore(args.store) if args.store else None
+    deduplicator = None
+    if args.dedup:
+        from models.dedup import Deduplicator
+        deduplicator = Deduplicator(threshold=args.dedup_threshold, max_representatives=args.dedup_max_clusters)
+
+    summary = run_batch(
+        args.input,
+        args.output,
+        tasks=tuple(args.tasks),
+        text_column=args.text_column,
+        keep_columns=tuple(args.keep_column),
+        output_format=args.format,
+        preprocessing_options={option: True for option in args.preprocess},
+        chunksize=args.chunksize,
+        batch_size=args.batch_size,
+        resume=not args.no_resume,
+        on_progress=lambda rows: print(f"{rows} rows done", file=sys.stderr),
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        store=store,
+        date_column=args.date_column,
+        deduplicator=deduplicator,
+    )
+    if args.profile_output:
+        from models.profiling import write_stats
+        write_stats(args.profile_output)
+    if summary['resumed_from']:
+        print(f"Resumed after {summary['resumed_from']} rows", file=sys.stderr)
+    print(f"Analysed {summary['rows']} rows into {args.output}", file=sys.stderr)
+    if deduplicator is not None:
+        stats = deduplicator.stats()
+        print(f"Deduplication: {stats['exact_duplicates']} exact and {stats['near_duplicates']} near duplicates, "
+              f"{stats['analysed']} of {stats['documents']} rows analysed ({stats['saved']:.1%} of inference saved)", file=sys.stderr)
+
+def backend_command(args):
+    from models.backends import check_parity, load_backend
+    from models.model_registry import MODEL_SPECS, get_tokenizer
+
+    if args.parity_file:
+        with open(args.parity_file, 'r') as file:
+            texts = [line.strip() for line in file if line.strip()]
+    else:
+        texts = PARITY_SAMPLES
+    for name in args.models:
+        load_backend(MODEL_SPECS[name], args.backend, get_tokenizer(name))
+        print(f"{name}: {args.backend} artifact ready")
+        if args.backend != 'torch':
+            parity = check_parity(name, args.backend, texts)
+            print(f"{name}: max abs diff {parity['max_abs_diff']:.4f}, label agreement {parity['label_agreement']:.2%}")
+
+def report_command(args):
+    from models.reports import iter_result_records, write_excel_report, write_pdf_report
+
+    if args.results.endswith(('.db', '.sqlite')):
+        from models.result_store import ResultStore
+        records = ResultStore(args.results).iter_records(source=args.source, start=args.start, end=args.end, chunksize=args.chunksize)
+    else:
+        records = iter_result_records(args.results, chunksize=args.chunksize)
+    if args.output.endswith('.pdf'):
+        documents = write_pdf_report(records, args.output, max_documents=args.max_pdf_documents or None)
+    elif args.output.endswith('.xlsx'):
+        documents = write_excel_report(records, args.output)
+    else:
+        raise SystemExit("Report output must be a .pdf or .xlsx file")
+    print(f"Wrote a report on {documents} documents to {args.output}", file=sys.stderr)
+
+def trends_command(args):
+    from models.result_store import ResultStore
+
+    store = ResultStore(args.store)
+    print(f"{'period':<18}{'documents':>10}{'mean':>8}{'positive':>10}")
+    for period, documents, mean, positive in store.trend(args.period, source=args.source, start=args.start, end=args.end):
+        mean = f"{mean:+.2f}" if mean is not None else '-'
+        positive = f"{positive:.0%}" if positive is not None else '-'
+        print(f"{period:<18}{documents:>10}{mean:>8}{positive:>10}")
+
+def serve_command(args):
+    from controllers.http_service import serve
+
+    serve(args.host, args.port, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms,
+          max_queue=args.max_queue, warm=not args.no_warm_up)
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Advanced Sentiment Analysis Tool (headless mode)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    analyse = commands.add_parser('analyse', help='Stream a CSV, JSONL, JSON or text file through the analyser')
+    analyse.add_argument('input', help='File to analyse')
+    analyse.add_argument('-o', '--output', required=True, help='JSONL or CSV file, or a directory for Parquet parts')
+    analyse.add_argument('--format', choices=['jsonl', 'csv', 'parquet'], help='Output format (default: from the output extension)')
+    analyse.add_argument('--tasks', nargs='+', choices=['sentiment', 'emotion', 'ner'], default=['sentiment', 'emotion', 'ner'])
+    analyse.add_argument('--text-column', default='text', help='Column holding the text (default: text)')
+    analyse.add_argument('--keep-column', action='append', default=[], help='Input column to copy into the output; repeatable')
+    analyse.add_argument('--preprocess', action='append', default=[], choices=sorted(DEFAULT_OPTIONS), help='Preprocessing option to enable; repeatable')
+    analyse.add_argument('--chunksize', type=int, default=1000, help='Rows read and checkpointed per step')
+    analyse.add_argument('--batch-size', type=int, default=16, help='Token windows per forward pass')
+    analyse.add_argument('--workers', type=int, default=1, help='Worker processes to spread inference across (default: 1, in-process)')
+    analyse.add_argument('--threads-per-worker', type=int, help='torch threads in each worker (default: ASAT_THREADS_PER_WORKER or 1)')
+    analyse.add_argument('--profile-output', help='Write per-stage timing statistics to this JSON file (in-process stages only)')
+    analyse.add_argument('--store', help='Also record results in this SQLite result store')
+    analyse.add_argument('--date-column', help='Column with each document\'s date, for the result store')
+    analyse.add_argument('--dedup', action='store_true', help='Analyse one row per cluster of exact or near-duplicate texts and copy its results')
+    analyse.add_argument('--dedup-threshold', type=float, default=0.8, help='Estimated Jaccard similarity for near duplicates (default: 0.8)')
+    analyse.add_argument('--dedup-max-clusters', type=int, default=100000, help='Clusters remembered for matching, bounding memory (default: 100000)')
+    analyse.add_argument('--no-resume', action='store_true', help='Ignore an existing checkpoint and start over')
+    analyse.set_defaults(handler=analyse_command)
+
+    report = commands.add_parser('report', help='Write a PDF or Excel report from the output of the analyse command')
+    report.add_argument('results', help='JSONL or CSV file or directory of Parquet parts written by analyse, or a result store (.db)')
+    report.add_argument('-o', '--output', required=True, help='Report file (.pdf or .xlsx)')
+    report.add_argument('--max-pdf-documents', type=int, default=5000, help='Documents listed individually in a PDF; 0 for all (default: 5000)')
+    report.add_argument('--chunksize', type=int, default=1000, help='Result rows read at a time')
+    report.set_defaults(handler=report_command)
+
+    trends = commands.add_parser('trends', help='Print sentiment per period from a result store')
+    trends.add_argument('store', help='Result store (.db) written by analyse --store or the GUI')
+    trends.add_argument('--period', choices=['hour', 'day', 'week', 'month'], default='day')
+    trends.set_defaults(handler=trends_command)
+    for command in (report, trends):
+        command.add_argument('--source', help='Only documents from this source (result stores only)')
+        command.add_argument('--start', help='Only documents dated on or after this ISO date (result stores only)')
+        command.add_argument('--end', help='Only documents dated before this ISO date (result stores only)')
+
+    serve = commands.add_parser('serve', help='Serve the analyser over HTTP with micro-batching')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8000)
+    serve.add_argument('--max-batch-size', type=int, default=32, help='Documents per model batch (default: 32)')
+    serve.add_argument('--max-wait-ms', type=float, default=10, help='How long a batch waits for more requests (default: 10)')
+    serve.add_argument('--max-queue', type=int, default=256, help='Queued requests per model before answering 503 (default: 256)')
+    serve.add_argument('--no-warm-up', action='store_true', help='Load models on first request instead of at start-up')
+    serve.set_defaults(handler=serve_command)
+
+    backend = commands.add_parser('backend', help='Export or quantize models for a backend and check them against eager torch')
+    backend.add_argument('backend', choices=['torch', 'quantized', 'onnx'])
+    backend.add_argument('--models', nargs='+', choices=['sentiment', 'emotion', 'ner'], default=['sentiment', 'emotion', 'ner'])
+    backend.add_argument('--parity-file', help='Text file with one sample per line for the parity check')
+    backend.set_defaults(handler=backend_command)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
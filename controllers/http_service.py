@@ -0,0 +1,319 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from models.model_registry import model_stats, warm_up
+from models.profiling import percentile, stage_stats
+from models.sentiment_analyser import emotion_scores_batch, recognize_entities_batch, sentiment_scores_batch, significant_emotions
+
+MAX_REQUEST_BYTES = 1 << 20
+MAX_REQUEST_DOCUMENTS = 256
+REQUEST_TIMEOUT = 30
+
+class Overloaded(Exception):
+    """Raised when a scheduler's queue is full; the server answers 503."""
+
+class MicroBatcher:
+    """
+    Collects concurrent requests for one model into shared batches.
+
+    A worker thread takes the oldest queued request, then keeps adding
+    requests until the batch holds max_batch_size documents or max_wait_ms
+    has passed since the first one arrived, and runs them all in one call.
+    The queue is bounded: submit raises Overloaded instead of letting
+    latency grow without limit.
+    """
+
+    def __init__(self, name, run_batch, max_batch_size=32, max_wait_ms=10, max_queue=256):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._latencies = deque(maxlen=1000)
+        self._batch_sizes = deque(maxlen=1000)
+        self._counts = {'requests': 0, 'documents': 0, 'batches': 0, 'rejected': 0, 'failed': 0}
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._loop, name=f'batcher-{name}', daemon=True)
+        self._thread.start()
+
+    def submit(self, texts):
+        """
+        Queue texts for the next batch.
+
+        Returns:
+            Future: Resolves to the list of results for these texts.
+
+        Raises:
+            Overloaded: The queue is full.
+        """
+        future = Future()
+        try:
+            self._queue.put_nowait((list(texts), future, time.perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self._counts['rejected'] += 1
+            raise Overloaded(f"{self.name} queue is full")
+        return future
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        size = len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopped = True
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _loop(self):
+        while not self._stopped:
+            batch = self._collect()
+            if batch is None:
+                return
+            texts = [text for item, _, _ in batch for text in item]
+            try:
+                results = self.run_batch(texts)
+            except Exception as e:
+                with self._lock:
+                    self._counts['failed'] += len(batch)
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+            offset = 0
+            for item, future, queued in batch:
+                future.set_result(results[offset:offset + len(item)])
+                offset += len(item)
+                self._latencies.append(finished - queued)
+            with self._lock:
+                self._counts['requests'] += len(batch)
+                self._counts['documents'] += len(texts)
+                self._counts['batches'] += 1
+                self._batch_sizes.append(len(texts))
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+            latencies = list(self._latencies)
+            sizes = list(self._batch_sizes)
+        return {
+            **counts,
+            'queued': self._queue.qsize(),
+            'mean_batch_size': sum(sizes) / len(sizes) if sizes else 0.0,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+        }
+
+    def stop(self):
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            self._stopped = True
+
+def _recognize_entities(texts, batch_size):
+    results = recognize_entities_batch(texts, batch_size=batch_size)
+    for result in results:
+        if isinstance(result, str):
+            raise RuntimeError(result)
+    return results
+
+def _sentiment_result(scores, options):
+    label = max(scores, key=scores.get)
+    return {'label': label, 'score': scores[label], 'scores': scores}
+
+def _emotion_result(scores, options):
+    return significant_emotions(scores, float(options.get('threshold', 0.05)))
+
+def _entity_result(entities, options):
+    return entities
+
+# Endpoint (and scheduler) name -> shapes one raw model result for the response.
+ENDPOINTS = {
+    'sentiment': _sentiment_result,
+    'emotion': _emotion_result,
+    'ner': _entity_result,
+}
+
+class AnalysisService:
+    """
+    The HTTP server's schedulers, one MicroBatcher per model.
+
+    Args:
+        max_batch_size (int): Documents per model batch.
+        max_wait_ms (float): How long a batch waits for more requests.
+        max_queue (int): Requests waiting per model before new ones are refused.
+    """
+
+    def __init__(self, max_batch_size=32, max_wait_ms=10, max_queue=256):
+        self.started = time.time()
+        self.batchers = {
+            'sentiment': MicroBatcher('sentiment', lambda texts: sentiment_scores_batch(texts, max_batch_size),
+                                      max_batch_size, max_wait_ms, max_queue),
+            'emotion': MicroBatcher('emotion', lambda texts: emotion_scores_batch(texts, max_batch_size),
+                                    max_batch_size, max_wait_ms, max_queue),
+            'ner': MicroBatcher('ner', lambda texts: _recognize_entities(texts, max_batch_size),
+                                max_batch_size, max_wait_ms, max_queue),
+        }
+
+    def analyse(self, endpoints, texts, options, timeout=REQUEST_TIMEOUT):
+        """
+        Run texts through one or more endpoints; their batches are queued at once and run concurrently.
+
+        Returns:
+            dict: endpoint -> list of results, one per text.
+
+        Raises:
+            Overloaded: A scheduler queue is full.
+            concurrent.futures.TimeoutError: Results took longer than timeout.
+        """
+        futures = {endpoint: self.batchers[endpoint].submit(texts) for endpoint in endpoints}
+        deadline = time.perf_counter() + timeout
+        results = {}
+        for endpoint, future in futures.items():
+            shape = ENDPOINTS[endpoint]
+            raw = future.result(timeout=max(deadline - time.perf_counter(), 0))
+            results[endpoint] = [shape(result, options) for result in raw]
+        return results
+
+    def health(self):
+        # Models load on first use, so 'ready' is false until every one has been loaded.
+        models = {name: stats['loaded'] for name, stats in model_stats().items()}
+        return {'status': 'ok', 'ready': all(models.values()), 'models': models}
+
+    def metrics(self):
+        return {
+            'uptime_seconds': time.time() - self.started,
+            'schedulers': {name: batcher.stats() for name, batcher in self.batchers.items()},
+            'stages': stage_stats(),
+            'models': model_stats(),
+        }
+
+    def stop(self):
+        for batcher in self.batchers.values():
+            batcher.stop()
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, status, body, headers=None):
+            payload = json.dumps(body, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send(200, service.health())
+            elif self.path == '/metrics':
+                self._send(200, service.metrics())
+            else:
+                self._send(404, {'error': f"Unknown path: {self.path}"})
+
+        def do_POST(self):
+            endpoint = self.path.strip('/')
+            if endpoint == 'analyse':
+                endpoints = list(ENDPOINTS)
+            elif endpoint in ENDPOINTS:
+                endpoints = [endpoint]
+            else:
+                self._send(404, {'error': f"Unknown path: {self.path}"})
+                return
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                if length < 0:
+                    raise ValueError(length)
+            except ValueError:
+                # Reading a body of unknown length would block until the client disconnects.
+                self.close_connection = True
+                self._send(400, {'error': f"Invalid Content-Length: {self.headers.get('Content-Length')}"})
+                return
+            if length > MAX_REQUEST_BYTES:
+                self.close_connection = True
+                self._send(413, {'error': f"Request body over {MAX_REQUEST_BYTES} bytes"})
+                return
+            try:
+                body = json.loads(self.rfile.read(length) or b'{}')
+                single = 'text' in body
+                texts = [body['text']] if single else body['texts']
+                if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                    raise ValueError("'texts' must be a list of strings")
+            except (ValueError, KeyError, TypeError) as e:
+                self._send(400, {'error': f"Expected a JSON body with 'text' or 'texts': {str(e)}"})
+                return
+            try:
+                # Parsed before any work is queued, so a bad value is the client's error, not the batch's.
+                body['threshold'] = float(body.get('threshold', 0.05))
+            except (ValueError, TypeError):
+                self._send(400, {'error': f"'threshold' must be a number, got {body['threshold']!r}"})
+                return
+            if len(texts) > MAX_REQUEST_DOCUMENTS:
+                self._send(413, {'error': f"At most {MAX_REQUEST_DOCUMENTS} texts per request"})
+                return
+            try:
+                results = service.analyse(endpoints, texts, body)
+            except Overloaded as e:
+                self._send(503, {'error': str(e)}, {'Retry-After': '1'})
+                return
+            except FutureTimeout:
+                self._send(504, {'error': f"No result within {REQUEST_TIMEOUT}s"})
+                return
+            except Exception as e:
+                self._send(500, {'error': f"Error in {endpoint}: {str(e)}"})
+                return
+            if endpoint != 'analyse':
+                results = results[endpoint]
+            else:
+                results = [dict(zip(results, values)) for values in zip(*results.values())]
+            self._send(200, {'result': results[0]} if single else {'results': results})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def serve(host='127.0.0.1', port=8000, max_batch_size=32, max_wait_ms=10, max_queue=256, warm=True):
+    """
+    Serve the analyser over HTTP until interrupted.
+
+    POST /sentiment, /emotion, /ner or /analyse with {"text": ...} or
+    {"texts": [...]} (and an optional "threshold" for emotions). A full
+    scheduler queue is answered with 503 and Retry-After. GET /health reports
+    whether the models are loaded and GET /metrics returns scheduler, stage
+    and model statistics.
+    """
+    service = AnalysisService(max_batch_size, max_wait_ms, max_queue)
+    if warm:
+        warm_up()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    print(f"Serving on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
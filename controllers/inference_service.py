@@ -0,0 +1,116 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+class _JobSignals(QObject):
+    result = pyqtSignal(str, int, str, object)
+    error = pyqtSignal(str, int, str)
+    done = pyqtSignal(object)
+
+class _Job(QRunnable):
+    """
+    Runs a job on a pool thread.
+
+    A job is a callable returning an iterable of (kind, result) pairs, so a
+    multi-stage analysis can report each stage as soon as it finishes. The
+    job is abandoned between stages once a newer request replaces it.
+    """
+
+    def __init__(self, channel, request_id, job, is_current):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.channel = channel
+        self.request_id = request_id
+        self.job = job
+        self.is_current = is_current
+        self.signals = _JobSignals()
+
+    def run(self):
+        try:
+            if not self.is_current(self.channel, self.request_id):
+                return
+            for kind, result in self.job():
+                if not self.is_current(self.channel, self.request_id):
+                    return
+                self.signals.result.emit(self.channel, self.request_id, kind, result)
+        except Exception as e:
+            self.signals.error.emit(self.channel, self.request_id, str(e))
+        finally:
+            self.signals.done.emit(self)
+
+class InferenceService(QObject):
+    """
+    Runs model calls off the GUI thread and posts results back through signals.
+
+    Requests are grouped into channels. A new request on a channel supersedes
+    the previous one: stale jobs that have not started are skipped, running
+    jobs stop at their next stage, and results that are already on their way
+    are dropped. Requests made through submit_debounced wait until no newer
+    request has arrived on that channel for `debounce_ms`.
+    """
+
+    result_ready = pyqtSignal(str, str, object)
+    error = pyqtSignal(str, str)
+
+    def __init__(self, parent=None, debounce_ms=300, max_threads=1):
+        super().__init__(parent)
+        self.debounce_ms = debounce_ms
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._latest = {}
+        self._jobs = set()
+        self._timers = {}
+        self._pending = {}
+
+    def _is_current(self, channel, request_id):
+        return self._latest.get(channel) == request_id
+
+    def submit(self, channel, job):
+        """Run a job now, superseding whatever is queued or running on the channel."""
+        self._cancel_pending(channel)
+        request_id = self._latest.get(channel, 0) + 1
+        self._latest[channel] = request_id
+        runnable = _Job(channel, request_id, job, self._is_current)
+        runnable.signals.result.connect(self._on_result)
+        runnable.signals.error.connect(self._on_error)
+        runnable.signals.done.connect(self._jobs.discard)
+        self._jobs.add(runnable)
+        self.pool.start(runnable)
+        return request_id
+
+    def submit_debounced(self, channel, job):
+        """Run a job once the channel has been quiet for debounce_ms."""
+        self._pending[channel] = job
+        timer = self._timers.get(channel)
+        if timer is None:
+            timer = self._timers[channel] = QTimer(self)
+            timer.setSingleShot(True)
+            timer.timeout.connect(lambda: self._fire(channel))
+        timer.start(self.debounce_ms)
+
+    def _fire(self, channel):
+        job = self._pending.pop(channel, None)
+        if job is not None:
+            self.submit(channel, job)
+
+    def _cancel_pending(self, channel):
+        self._pending.pop(channel, None)
+        timer = self._timers.get(channel)
+        if timer is not None:
+            timer.stop()
+
+    def cancel(self, channel):
+        """Drop the pending and in-flight requests on a channel."""
+        self._cancel_pending(channel)
+        self._latest[channel] = self._latest.get(channel, 0) + 1
+
+    def _on_result(self, channel, request_id, kind, result):
+        if self._is_current(channel, request_id):
+            self.result_ready.emit(channel, kind, result)
+
+    def _on_error(self, channel, request_id, message):
+        if self._is_current(channel, request_id):
+            self.error.emit(channel, message)
+
+    def shutdown(self):
+        for channel in list(self._latest):
+            self.cancel(channel)
+        self.pool.waitForDone()
@@ -1,11 +1,13 @@
 from PyQt5.QtWidgets import QApplication
 from views.main_window import MainWindow
+from models.model_registry import warm_up
 import sys
 
 def main():
     app = QApplication(sys.argv)  # Create an application object
     mainWindow = MainWindow()     # Create an instance of your main window class
     mainWindow.show()             # Show the main window
+    warm_up(['sentiment', 'emotion'])  # Load the common models in the background; NER loads on first use
     sys.exit(app.exec_())         # Start the event loop
 
 if __name__ == "__main__":
@@ -0,0 +1,143 @@
+import os
+import types
+
+# Every backend exposes the same interface the analyser uses from a torch
+# model: `.config` and `model(input_ids=..., attention_mask=...).logits`.
+BACKENDS = ('torch', 'quantized', 'onnx')
+ARTIFACT_DIR = os.environ.get('ASAT_ARTIFACT_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'asat'))
+
+def _auto_model_class(spec):
+    from transformers import AutoModelForSequenceClassification, AutoModelForTokenClassification
+    return AutoModelForTokenClassification if spec['task'] == 'ner' else AutoModelForSequenceClassification
+
+def artifact_path(spec, backend):
+    import torch
+
+    directory = os.path.join(ARTIFACT_DIR, spec['model'].replace('/', '__'))
+    if backend == 'quantized':
+        # Pickled quantized modules are tied to the torch version that wrote them.
+        return os.path.join(directory, f'quantized-torch-{torch.__version__}.pt')
+    return os.path.join(directory, 'model.onnx')
+
+def load_eager(spec):
+    model = _auto_model_class(spec).from_pretrained(spec['model'])
+    model.eval()
+    return model
+
+def export_quantized(spec, path):
+    """Dynamically quantize the Linear layers to int8 and save the whole module."""
+    import torch
+
+    model = torch.quantization.quantize_dynamic(load_eager(spec), {torch.nn.Linear}, dtype=torch.qint8)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    torch.save(model, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+def export_onnx(spec, tokenizer, path):
+    """Export the eager model to ONNX with dynamic batch and sequence axes."""
+    import torch
+
+    model = load_eager(spec)
+    model.config.return_dict = False
+    sample = tokenizer(['export sample'], return_tensors='pt')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    dynamic_axes = {'input_ids': {0: 'batch', 1: 'sequence'}, 'attention_mask': {0: 'batch', 1: 'sequence'}}
+    dynamic_axes['logits'] = {0: 'batch', 1: 'sequence'} if spec['task'] == 'ner' else {0: 'batch'}
+    torch.onnx.export(
+        model,
+        (sample['input_ids'], sample['attention_mask']),
+        path + '.tmp',
+        input_names=['input_ids', 'attention_mask'],
+        output_names=['logits'],
+        dynamic_axes=dynamic_axes,
+        opset_version=14,
+    )
+    os.replace(path + '.tmp', path)
+
+class OnnxModel:
+    """ONNX Runtime session behind the torch model call interface."""
+
+    def __init__(self, path, config):
+        import onnxruntime
+        import torch
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # Follow torch's thread setting so worker processes stay within their share of cores.
+        options.intra_op_num_threads = torch.get_num_threads()
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.config = config
+        self.size_bytes = os.path.getsize(path)
+
+    def __call__(self, input_ids, attention_mask):
+        import torch
+
+        logits = self.session.run(['logits'], {
+            'input_ids': input_ids.numpy(),
+            'attention_mask': attention_mask.numpy(),
+        })[0]
+        return types.SimpleNamespace(logits=torch.from_numpy(logits))
+
+def load_backend(spec, backend, tokenizer):
+    """
+    Load a model with the given backend, exporting its artifact on first use.
+
+    The quantized and ONNX backends never load the full-precision weights
+    once their artifact exists.
+
+    Args:
+        spec (dict): Entry of MODEL_SPECS.
+        backend (str): One of BACKENDS.
+        tokenizer: The model's tokenizer, used to trace the ONNX export.
+
+    Returns:
+        A model callable with input_ids and attention_mask.
+    """
+    import torch
+    from transformers import AutoConfig
+
+    if backend == 'torch':
+        return load_eager(spec)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+    path = artifact_path(spec, backend)
+    if backend == 'quantized':
+        if not os.path.exists(path):
+            export_quantized(spec, path)
+        model = torch.load(path, weights_only=False)
+        model.eval()
+        model.size_bytes = os.path.getsize(path)
+        return model
+    if not os.path.exists(path):
+        export_onnx(spec, tokenizer, path)
+    return OnnxModel(path, AutoConfig.from_pretrained(spec['model']))
+
+def check_parity(name, backend, texts):
+    """
+    Compare a backend's outputs with the eager torch model on the same texts.
+
+    Returns:
+        dict: 'max_abs_diff' between the probabilities of every token window
+        (and every token, for NER) and 'label_agreement', the fraction of
+        predictions whose top label matches.
+    """
+    from models.model_registry import MODEL_SPECS, get_tokenizer
+    from models.sentiment_analyser import DEFAULT_BATCH_SIZE, _split_documents, _run_bucketed
+
+    spec = MODEL_SPECS[name]
+    tokenizer = get_tokenizer(name)
+    chunks, _ = _split_documents(list(texts), tokenizer)
+    expected = _run_bucketed(load_eager(spec), tokenizer, chunks, DEFAULT_BATCH_SIZE)
+    actual = _run_bucketed(load_backend(spec, backend, tokenizer), tokenizer, chunks, DEFAULT_BATCH_SIZE)
+    max_diff = 0.0
+    agreeing = total = 0
+    for chunk, eager, candidate in zip(chunks, expected, actual):
+        if eager.dim() > 1:
+            # Padding positions differ between batches; compare real tokens only.
+            length = len(chunk['input_ids'])
+            eager, candidate = eager[:length], candidate[:length]
+        max_diff = max(max_diff, float((eager - candidate).abs().max()))
+        matches = eager.argmax(dim=-1) == candidate.argmax(dim=-1)
+        agreeing += int(matches.sum())
+        total += matches.numel()
+    return {'max_abs_diff': max_diff, 'label_agreement': agreeing / total if total else 1.0}
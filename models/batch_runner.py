@@ -0,0 +1,259 @@
+import json
+import os
+import pandas as pd
+from models.data_loader import file_format, iter_data
+from models.dedup import analyse_deduplicated
+from models.preprocessing import ensure_nltk_data, options_fingerprint, preprocess_batch
+from models.process_pool import parallel_analyse
+from models.sentiment_analyser import (
+    DEFAULT_BATCH_SIZE, analyse_batch, sentiment_scores_batch, detect_emotion_batch, recognize_entities_batch,
+    model_identity, significant_emotions,
+)
+
+TASKS = ('sentiment', 'emotion', 'ner')
+OUTPUT_FORMATS = ('jsonl', 'csv', 'parquet')
+
+def analyse_records(texts, tasks=TASKS, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Run the selected models over texts.
+
+    Args:
+        texts (list): Preprocessed texts.
+        tasks (tuple): Any of 'sentiment', 'emotion' and 'ner'.
+        batch_size (int): Number of token windows per forward pass.
+
+    Returns:
+        list: One dict per text with 'sentiment' and 'sentiment_score',
+        'emotions' and/or 'entities', depending on the tasks.
+    """
+    texts = list(texts)
+    try:
+        # One scheduling pass for all tasks; see sentiment_analyser.analyse_batch.
+        results = analyse_batch(texts, [task for task in TASKS if task in tasks], batch_size)
+    except Exception:
+        # Run the tasks one by one, so a failing model only fails its own column.
+        return _analyse_records_separately(texts, tasks, batch_size)
+    records = []
+    for result in results:
+        record = {}
+        if 'sentiment' in result:
+            record['sentiment'] = max(result['sentiment'], key=result['sentiment'].get)
+            record['sentiment_score'] = result['sentiment'][record['sentiment']]
+        if 'emotion' in result:
+            record['emotions'] = significant_emotions(result['emotion'])
+        if 'ner' in result:
+            record['entities'] = result['ner']
+        records.append(record)
+    return records
+
+def result_provenance(preprocessing_options=None):
+    """
+    How results are computed with the current settings, as recorded with them
+    in a models.result_store.ResultStore.
+
+    Stored results are reused for their sentiment, so the sentiment model and
+    backend are recorded, with the enabled preprocessing options.
+    """
+    model, backend = model_identity('sentiment')
+    return {'model': model, 'backend': backend, 'preprocessing': options_fingerprint(preprocessing_options)}
+
+def _analyse_records_separately(texts, tasks, batch_size):
+    records = [{} for _ in texts]
+    if 'sentiment' in tasks:
+        try:
+            for record, scores in zip(records, sentiment_scores_batch(texts, batch_size)):
+                record['sentiment'] = max(scores, key=scores.get)
+                record['sentiment_score'] = scores[record['sentiment']]
+        except Exception as e:
+            for record in records:
+                record['sentiment'] = f"Error in sentiment analysis: {str(e)}"
+                record['sentiment_score'] = None
+    if 'emotion' in tasks:
+        for record, emotions in zip(records, detect_emotion_batch(texts, batch_size=batch_size)):
+            record['emotions'] = emotions
+    if 'ner' in tasks:
+        for record, entities in zip(records, recognize_entities_batch(texts, batch_size=batch_size)):
+            record['entities'] = entities
+    return records
+
+def _flatten(record):
+    """Nested results are stored as JSON strings in tabular formats."""
+    return {key: json.dumps(value, default=str) if isinstance(value, (list, dict)) else value for key, value in record.items()}
+
+class _FileWriter:
+    """
+    Appends to a JSONL or CSV file; its size is the resume position.
+
+    CSV rows follow the header written with the first chunk; `columns` (kept
+    in the checkpoint) carries it across resumed runs, so records with more or
+    fewer fields still line up with it.
+    """
+
+    def __init__(self, path, output_format, position, columns=None):
+        self.path = path
+        self.output_format = output_format
+        with open(path, 'a'):
+            pass
+        # Anything past the checkpointed size was written after the last checkpoint.
+        os.truncate(path, position or 0)
+        if output_format == 'csv' and columns is None and position:
+            # Checkpoints written before the columns were recorded: take them from the header.
+            columns = list(pd.read_csv(path, nrows=0).columns)
+        self.columns = columns
+
+    def write(self, records):
+        with open(self.path, 'a', newline='') as file:
+            if self.output_format == 'jsonl':
+                for record in records:
+                    file.write(json.dumps(record, default=str) + '\n')
+            else:
+                frame = pd.DataFrame([_flatten(record) for record in records])
+                if self.columns is None:
+                    self.columns = list(frame.columns)
+                frame.reindex(columns=self.columns).to_csv(file, index=False, header=file.tell() == 0)
+            file.flush()
+            os.fsync(file.fileno())
+        return os.path.getsize(self.path)
+
+class _ParquetWriter:
+    """Writes one part file per chunk into a directory; the part count is the resume position."""
+
+    def __init__(self, path, position):
+        self.path = path
+        self.parts = position or 0
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, records):
+        frame = pd.DataFrame([_flatten(record) for record in records])
+        frame.to_parquet(os.path.join(self.path, f'part-{self.parts:05d}.parquet'), index=False)
+        self.parts += 1
+        return self.parts
+
+def _read_checkpoint(path):
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+def _write_checkpoint(path, checkpoint):
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(checkpoint, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+def run_batch(input_path, output_path, tasks=TASKS, text_column='text', keep_columns=(),
+              output_format=None, preprocessing_options=None, chunksize=1000,
+              batch_size=DEFAULT_BATCH_SIZE, resume=True, on_progress=None,
+              workers=1, threads_per_worker=None, store=None, date_column=None, deduplicator=None):
+    """
+    Stream a file through preprocessing and the selected models.
+
+    Rows are read `chunksize` at a time and each chunk's results are appended
+    to the output before a checkpoint is written next to it. A rerun with
+    resume=True skips the rows recorded in the checkpoint and discards any
+    output written after it, so an interrupted run carries on where it stopped.
+
+    Args:
+        input_path (str): CSV, JSONL, JSON, Parquet or text file, optionally compressed.
+        output_path (str): JSONL or CSV file, or a directory of Parquet parts.
+        tasks (tuple): Any of 'sentiment', 'emotion' and 'ner'.
+        text_column (str): Column holding the text to analyse.
+        keep_columns (tuple): Input columns copied to the output unchanged.
+        output_format (str): 'jsonl', 'csv' or 'parquet'; guessed from the
+            output extension by default.
+        preprocessing_options (dict): Preprocessing options, see models.preprocessing.
+        chunksize (int): Rows read and written per step.
+        batch_size (int): Number of token windows per forward pass.
+        resume (bool): Continue from an existing checkpoint.
+        on_progress (callable): Called with the number of rows done after each chunk.
+        workers (int): Worker processes to shard each chunk across; 1 runs in
+            this process.
+        threads_per_worker (int): torch intra-op threads in each worker.
+        store (ResultStore): Also record each chunk's results here, see
+            models.result_store. Rows stored after the last checkpoint are
+            removed on resume, so a chunk is never stored twice.
+        date_column (str): Column holding each document's date for the store;
+            the time of analysis by default.
+        deduplicator (Deduplicator): Analyse one text per cluster of exact or
+            near duplicates and copy its results to the others, see
+            models.dedup. Its clusters are not checkpointed, so a resumed run
+            starts matching afresh.
+
+    Returns:
+        dict: 'rows' processed in this run and 'resumed_from' row count.
+    """
+    if output_format is None:
+        output_format = os.path.splitext(output_path)[1].lstrip('.') or 'parquet'
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format}")
+    preprocessing_options = preprocessing_options or {}
+    if any(preprocessing_options.values()):
+        ensure_nltk_data()
+
+    checkpoint_path = output_path.rstrip('/') + '.checkpoint'
+    checkpoint = _read_checkpoint(checkpoint_path) if resume else None
+    if checkpoint is not None and checkpoint.get('input') != os.path.abspath(input_path):
+        raise ValueError(f"Checkpoint {checkpoint_path} belongs to {checkpoint.get('input')}")
+    rows_done = checkpoint['rows_done'] if checkpoint else 0
+    position = checkpoint['position'] if checkpoint else 0
+    if output_format == 'parquet':
+        writer = _ParquetWriter(output_path, position)
+    else:
+        writer = _FileWriter(output_path, output_format, position, checkpoint.get('columns') if checkpoint else None)
+    source = os.path.abspath(input_path)
+    store_id = None
+    if store is not None:
+        provenance = result_provenance(preprocessing_options)
+        if checkpoint is not None and checkpoint.get('store_id') is not None:
+            # Like output past the checkpointed position, these rows belong to the chunk being redone.
+            store_id = checkpoint['store_id']
+            store.discard_after(store_id, source)
+        else:
+            store_id = store.last_id()
+            if checkpoint is None:
+                # Checkpoint before the first chunk too, so a crash right after storing it can be undone.
+                _write_checkpoint(checkpoint_path, {'input': source, 'rows_done': 0, 'position': position, 'store_id': store_id,
+                                                   'columns': None})
+
+    if workers > 1:
+        analyse = lambda texts: parallel_analyse(texts, tasks, workers, threads_per_worker, batch_size=batch_size,
+                                                 preprocessing_options=preprocessing_options)
+    else:
+        analyse = lambda texts: analyse_records(preprocess_batch(texts, preprocessing_options), tasks, batch_size)
+    if deduplicator is not None:
+        analyse_unique = analyse
+        analyse = lambda texts: analyse_deduplicated(texts, analyse_unique, deduplicator)
+
+    resumed_from = rows_done
+    row = 0
+    # Plain text files only have a 'text' column; other formats read just the columns used.
+    columns = None if file_format(input_path) == 'txt' else list(dict.fromkeys([text_column, *keep_columns, *([date_column] if date_column else [])]))
+    for chunk in iter_data(input_path, chunksize=chunksize, columns=columns):
+        if row + len(chunk) <= rows_done:
+            row += len(chunk)
+            continue
+        chunk = chunk.iloc[max(rows_done - row, 0):]
+        row = max(row, rows_done)
+        texts = chunk[text_column].fillna('').astype(str).tolist()
+        kept = chunk[list(keep_columns)].to_dict('records') if keep_columns else [{}] * len(chunk)
+        records = [
+            {'row': row + offset, **columns, **result}
+            for offset, (columns, result) in enumerate(zip(kept, analyse(texts)))
+        ]
+        position = writer.write(records)
+        if store is not None:
+            dates = None
+            if date_column:
+                dates = [None if pd.isna(date) else date for date in pd.to_datetime(chunk[date_column], errors='coerce')]
+            ids = store.add_many(texts, records, source=source, dates=dates, provenance=provenance)
+            store_id = max(ids, default=store_id)
+        row += len(chunk)
+        rows_done = row
+        _write_checkpoint(checkpoint_path, {'input': source, 'rows_done': rows_done, 'position': position, 'store_id': store_id,
+                                            'columns': getattr(writer, 'columns', None)})
+        if on_progress is not None:
+            on_progress(rows_done)
+    return {'rows': rows_done - resumed_from, 'resumed_from': resumed_from}
@@ -1,20 +1,208 @@
+import bz2
+import gzip
+import lzma
+import os
 import pandas as pd
 
-def load_data(filepath):
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = pd.StringDtype('pyarrow')
+except ImportError:
+    STRING_DTYPE = pd.StringDtype()
+
+# pandas infers these from the extension for CSV and JSON; plain text is opened with the matching module.
+COMPRESSION_OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+COMPRESSION_SUFFIXES = ('.gz', '.bz2', '.xz', '.zip', '.zst')
+# Compression each format can be read through: pandas for CSV and JSON, the openers above
+# for plain text. Parquet compresses its pages internally and is read uncompressed.
+SUPPORTED_COMPRESSION = {
+    'csv': COMPRESSION_SUFFIXES,
+    'jsonl': COMPRESSION_SUFFIXES,
+    'json': COMPRESSION_SUFFIXES,
+    'parquet': (),
+    'txt': tuple(COMPRESSION_OPENERS),
+}
+
+def file_format(filepath):
+    """
+    The data format of a file, ignoring any compression suffix.
+
+    Returns:
+        str: 'csv', 'jsonl', 'json', 'parquet' or 'txt'.
+
+    Raises:
+        ValueError: The format or its compression is not supported.
+    """
+    if os.path.isdir(filepath):
+        # A directory of Parquet part files, as written by the batch runner.
+        return 'parquet'
+    name = filepath.lower()
+    compression = None
+    for suffix in COMPRESSION_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            compression = suffix
+            break
+    extension = os.path.splitext(name)[1].lstrip('.')
+    if extension == 'ndjson':
+        extension = 'jsonl'
+    if extension not in SUPPORTED_COMPRESSION:
+        raise ValueError(f"Unsupported file type: {filepath}")
+    if compression and compression not in SUPPORTED_COMPRESSION[extension]:
+        raise ValueError(f"Unsupported compression for {extension} files: {filepath}")
+    return extension
+
+def _open_text(filepath):
+    opener = COMPRESSION_OPENERS.get(os.path.splitext(filepath.lower())[1], open)
+    return opener(filepath, 'rt', encoding='utf-8', errors='replace')
+
+def _is_compressed(filepath):
+    return filepath.lower().endswith(COMPRESSION_SUFFIXES)
+
+def compact(frame, categories=()):
+    """
+    Shrink a chunk's memory: text columns become (pyarrow-backed, where available)
+    strings and the given low-cardinality columns become categoricals.
     """
-    Load data from a CSV or JSON file into a pandas DataFrame.
-    
+    dtypes = {}
+    for column in frame.columns:
+        if column in categories:
+            dtypes[column] = 'category'
+        elif frame[column].dtype == object and pd.api.types.infer_dtype(frame[column], skipna=True) == 'string':
+            # Columns holding nested values (lists, dicts) stay as Python objects.
+            dtypes[column] = STRING_DTYPE
+    return frame.astype(dtypes) if dtypes else frame
+
+def _select(frame, columns):
+    if columns is None:
+        return frame
+    missing = [column for column in columns if column not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    return frame[list(columns)]
+
+def _iter_parquet(filepath, chunksize, columns, memory_map):
+    import pyarrow.parquet as pq
+
+    if os.path.isdir(filepath):
+        paths = [os.path.join(filepath, name) for name in sorted(os.listdir(filepath)) if name.endswith('.parquet')]
+    else:
+        paths = [filepath]
+    for path in paths:
+        parquet = pq.ParquetFile(path, memory_map=memory_map)
+        # Only the requested columns are decoded, one row batch at a time.
+        for batch in parquet.iter_batches(batch_size=chunksize, columns=list(columns) if columns else None):
+            yield batch.to_pandas()
+
+def _iter_lines(filepath, chunksize):
+    with _open_text(filepath) as file:
+        lines = []
+        for line in file:
+            if line.strip():
+                lines.append(line.rstrip('\n'))
+            if len(lines) == chunksize:
+                yield pd.DataFrame({'text': lines})
+                lines = []
+        if lines:
+            yield pd.DataFrame({'text': lines})
+
+def iter_data(filepath, chunksize=1000, columns=None, categories=(), memory_map=False, compact_dtypes=True):
+    """
+    Read a CSV, JSON Lines, JSON, Parquet or plain text file in chunks of rows.
+
+    Compressed files (.gz, .bz2, .xz, and .zip/.zst for CSV and JSON) are
+    decompressed on the fly. Plain text files yield one row per non-empty
+    line in a 'text' column. A JSON array cannot be streamed, so it is loaded
+    once and then sliced.
+
+    Args:
+        filepath (str): Path to the file (or directory of Parquet parts) to be loaded.
+        chunksize (int): Number of rows per chunk.
+        columns (list): Only read these columns; CSV and Parquet skip the others
+            while parsing.
+        categories (tuple): Columns to store as categoricals.
+        memory_map (bool): Memory-map uncompressed CSV and Parquet files instead
+            of reading them through a buffer.
+        compact_dtypes (bool): Store text as string dtype, see compact.
+
+    Yields:
+        DataFrame: The next chunk of rows.
+
+    Raises:
+        ValueError: The format or its compression is not supported, or a column is missing.
+    """
+    data_format = file_format(filepath)
+    memory_map = memory_map and not _is_compressed(filepath)
+    if data_format == 'csv':
+        chunks = pd.read_csv(filepath, chunksize=chunksize, usecols=columns, memory_map=memory_map)
+    elif data_format == 'jsonl':
+        chunks = (_select(chunk, columns) for chunk in pd.read_json(filepath, lines=True, chunksize=chunksize))
+    elif data_format == 'json':
+        data = _select(pd.read_json(filepath), columns)
+        chunks = (data.iloc[start:start + chunksize] for start in range(0, len(data), chunksize))
+    elif data_format == 'parquet':
+        chunks = _iter_parquet(filepath, chunksize, columns, memory_map)
+    else:
+        chunks = _iter_lines(filepath, chunksize)
+    for chunk in chunks:
+        yield compact(chunk, categories) if compact_dtypes else chunk
+
+def load_data(filepath, columns=None, categories=(), memory_map=False):
+    """
+    Load data from a CSV, JSON Lines, JSON, Parquet or text file into a pandas DataFrame.
+
+    The file is read in chunks with compact dtypes, see iter_data; prefer
+    iter_data itself for files that do not fit in memory.
+
     Args:
         filepath (str): Path to the file to be loaded.
+        columns (list): Only load these columns.
+        categories (tuple): Columns to store as categoricals.
+        memory_map (bool): Memory-map uncompressed CSV and Parquet files.
 
     Returns:
         DataFrame: Loaded data.
+
+    Raises:
+        ValueError: The format or its compression is not supported, or a column is missing.
+    """
+    chunks = list(iter_data(filepath, chunksize=100000, columns=columns, categories=categories, memory_map=memory_map))
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(chunks, ignore_index=True)
+
+def iter_documents(filepaths, text_column='text', chunksize=1000):
+    """
+    Stream documents from several files, in batches.
+
+    Each plain text file is one document named after the file. Every row of a
+    tabular file is a document named '<file>:<row>'.
+
+    Args:
+        filepaths (list): Files to read.
+        text_column (str): Column holding the text in tabular files.
+        chunksize (int): Documents per batch.
+
+    Yields:
+        tuple: (names, texts) lists for the next batch of about chunksize documents.
     """
-    try:
-        if filepath.endswith('.csv'):
-            return pd.read_csv(filepath)
-        elif filepath.endswith('.json'):
-            return pd.read_json(filepath)
-    except Exception as e:
-        print(f"Error loading data: {e}")
-        return None
+    names, texts = [], []
+    for filepath in filepaths:
+        if file_format(filepath) == 'txt':
+            with _open_text(filepath) as file:
+                names.append(filepath)
+                texts.append(file.read())
+        else:
+            row = 0
+            for chunk in iter_data(filepath, chunksize=chunksize, columns=[text_column]):
+                names.extend(f"{filepath}:{row + offset}" for offset in range(len(chunk)))
+                texts.extend(chunk[text_column].fillna('').astype(str).tolist())
+                row += len(chunk)
+                if len(texts) >= chunksize:
+                    yield names, texts
+                    names, texts = [], []
+        if len(texts) >= chunksize:
+            yield names, texts
+            names, texts = [], []
+    if texts:
+        yield names, texts
@@ -0,0 +1,188 @@
+import hashlib
+import re
+import zlib
+from collections import OrderedDict
+import numpy as np
+
+# MinHash permutations are (a * x + b) mod PRIME over 32-bit shingle hashes;
+# with a, b, x below 2**32 the products fit in uint64 and the results in uint32.
+PRIME = 4294967291
+WORD_PATTERN = re.compile(r'\w+')
+
+def normalise(text):
+    """Lowercase words only, so case, punctuation and spacing differences hash the same."""
+    return ' '.join(WORD_PATTERN.findall(text.lower()))
+
+def exact_key(text):
+    return int.from_bytes(hashlib.blake2b(normalise(text).encode('utf-8'), digest_size=8).digest(), 'little')
+
+class Deduplicator:
+    """
+    Finds exact and near-duplicate texts in a stream, so only one text per
+    cluster needs to be analysed.
+
+    Exact duplicates are found by hashing the normalised text. Near
+    duplicates are found with MinHash signatures over word shingles and
+    locality-sensitive hashing: signatures are cut into bands, and texts
+    sharing a band with a representative are candidates, kept when their
+    estimated Jaccard similarity reaches the threshold.
+
+    Memory is bounded: at most max_representatives clusters (with their
+    signature and result) and max_exact exact hashes are kept, least
+    recently matched first out. A duplicate of an evicted cluster starts a
+    new one and is analysed again.
+
+    Args:
+        threshold (float): Minimum estimated Jaccard similarity of shingle sets.
+        num_perm (int): MinHash signature length.
+        bands (int): LSH bands; num_perm must divide evenly. More bands catch
+            less similar pairs as candidates.
+        shingle_size (int): Words per shingle.
+        max_representatives (int): Clusters kept for matching.
+        max_exact (int): Exact hashes kept for matching.
+        seed (int): Seed for the MinHash permutations.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=64, bands=8, shingle_size=3,
+                 max_representatives=100000, max_exact=1000000, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.max_representatives = max_representatives
+        self.max_exact = max_exact
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self._representatives = OrderedDict()
+        self._exact = OrderedDict()
+        self._bands = OrderedDict()
+        self._next_id = 0
+        self.documents = 0
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+        self.reanalysed = 0
+
+    def signature(self, text):
+        """MinHash signature of the text's word shingles."""
+        words = normalise(text).split()
+        size = self.shingle_size
+        shingles = [' '.join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))]
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+        hashes %= np.uint64(PRIME)
+        return ((self._a * hashes + self._b) % np.uint64(PRIME)).min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        return [hash((band, signature[band * self.rows:(band + 1) * self.rows].tobytes())) for band in range(self.bands)]
+
+    def _touch(self, mapping, key, value, limit):
+        mapping[key] = value
+        mapping.move_to_end(key)
+        while len(mapping) > limit:
+            mapping.popitem(last=False)
+
+    def _near_match(self, signature, band_keys):
+        for key in band_keys:
+            candidate = self._bands.get(key)
+            entry = self._representatives.get(candidate)
+            if entry is not None and np.mean(entry['signature'] == signature) >= self.threshold:
+                return candidate
+        return None
+
+    def assign(self, text):
+        """
+        Match one text against the clusters seen so far.
+
+        Returns:
+            tuple: (cluster id, kind) where kind is 'new' for the first text of
+            a cluster, else 'exact' or 'near'.
+        """
+        self.documents += 1
+        key = exact_key(text)
+        cluster = self._exact.get(key)
+        if cluster is not None and cluster in self._representatives:
+            self._exact.move_to_end(key)
+            self._representatives.move_to_end(cluster)
+            self.exact_duplicates += 1
+            return cluster, 'exact'
+        signature = self.signature(text)
+        band_keys = self._band_keys(signature)
+        cluster = self._near_match(signature, band_keys)
+        if cluster is not None:
+            self._representatives.move_to_end(cluster)
+            self._touch(self._exact, key, cluster, self.max_exact)
+            self.near_duplicates += 1
+            return cluster, 'near'
+        cluster = self._next_id
+        self._next_id += 1
+        self._touch(self._representatives, cluster, {'signature': signature, 'result': None}, self.max_representatives)
+        self._touch(self._exact, key, cluster, self.max_exact)
+        for band_key in band_keys:
+            self._touch(self._bands, band_key, cluster, self.max_representatives * self.bands)
+        return cluster, 'new'
+
+    def result(self, cluster):
+        entry = self._representatives.get(cluster)
+        return None if entry is None else entry['result']
+
+    def set_result(self, cluster, result):
+        entry = self._representatives.get(cluster)
+        if entry is not None:
+            entry['result'] = result
+
+    def stats(self):
+        """
+        Returns:
+            dict: Documents seen, exact and near duplicates, 'analysed' (the
+            rest) and 'saved', the fraction of documents not analysed.
+        """
+        duplicates = self.exact_duplicates + self.near_duplicates - self.reanalysed
+        return {
+            'documents': self.documents,
+            'exact_duplicates': self.exact_duplicates,
+            'near_duplicates': self.near_duplicates,
+            'analysed': self.documents - duplicates,
+            'saved': duplicates / self.documents if self.documents else 0.0,
+            'clusters_tracked': len(self._representatives),
+        }
+
+def analyse_deduplicated(texts, analyse, deduplicator):
+    """
+    Analyse one text per cluster and copy its result to the cluster's duplicates.
+
+    Args:
+        texts (list): Texts to analyse.
+        analyse (callable): Takes a list of texts, returns a list of result dicts.
+        deduplicator (Deduplicator): Clusters seen so far; updated in place.
+
+    Returns:
+        list: One result per text. Results of duplicates are copies of their
+        representative's, with 'duplicate' set to 'exact' or 'near'; entity
+        offsets in them refer to the representative's text.
+    """
+    assignments = [deduplicator.assign(text) for text in texts]
+    new_clusters = {cluster for cluster, kind in assignments if kind == 'new'}
+    to_analyse = {}
+    for text, (cluster, kind) in zip(texts, assignments):
+        if cluster in to_analyse:
+            continue
+        if kind == 'new':
+            to_analyse[cluster] = text
+        elif cluster not in new_clusters and deduplicator.result(cluster) is None:
+            # The representative's analysis failed in an earlier batch; this duplicate stands in for it.
+            deduplicator.reanalysed += 1
+            to_analyse[cluster] = text
+    # Kept locally too: a batch larger than the cluster limit can evict its own clusters.
+    computed = dict(zip(to_analyse, analyse(list(to_analyse.values())))) if to_analyse else {}
+    for cluster, result in computed.items():
+        deduplicator.set_result(cluster, result)
+    results = []
+    for cluster, kind in assignments:
+        result = computed.get(cluster)
+        result = dict(result if result is not None else deduplicator.result(cluster) or {})
+        result['duplicate'] = None if kind == 'new' else kind
+        results.append(result)
+    return results
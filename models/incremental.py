@@ -0,0 +1,118 @@
+import hashlib
+import re
+import threading
+from models.sentiment_analyser import sentiment_scores_batch, emotion_scores_batch, recognize_entities_batch, significant_emotions
+
+PARAGRAPH_PATTERN = re.compile(r'\S.*?(?=\n\s*\n|\Z)', re.DOTALL)
+SENTENCE_END_PATTERN = re.compile(r'(?<=[.!?])\s+')
+
+def split_stable_chunks(text, max_chars=1000):
+    """
+    Split text at paragraph boundaries, and long paragraphs at sentence ends.
+
+    Boundaries only depend on nearby text, so an edit in one place leaves the
+    chunks elsewhere in the document unchanged.
+
+    Returns:
+        list: (start offset, chunk text) pairs.
+    """
+    chunks = []
+    for paragraph in PARAGRAPH_PATTERN.finditer(text):
+        if len(paragraph.group()) <= max_chars:
+            chunks.append((paragraph.start(), paragraph.group()))
+            continue
+        piece_start = paragraph.start()
+        position = paragraph.start()
+        for sentence_end in SENTENCE_END_PATTERN.finditer(text, paragraph.start(), paragraph.end()):
+            if sentence_end.start() - piece_start > max_chars and position > piece_start:
+                chunks.append((piece_start, text[piece_start:position].rstrip()))
+                piece_start = position
+            position = sentence_end.end()
+        if paragraph.end() - piece_start > max_chars and position > piece_start:
+            chunks.append((piece_start, text[piece_start:position].rstrip()))
+            piece_start = position
+        chunks.append((piece_start, text[piece_start:paragraph.end()]))
+    return chunks
+
+def _chunk_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def _weighted_scores(chunk_scores, weights):
+    totals = {}
+    for scores, weight in zip(chunk_scores, weights):
+        for label, score in scores.items():
+            totals[label] = totals.get(label, 0.0) + score * weight
+    total_weight = sum(weights) or 1
+    return {label: total / total_weight for label, total in totals.items()}
+
+class IncrementalAnalyser:
+    """
+    Keeps per-chunk results for a document that is being edited.
+
+    Each call to update() splits the text into stable chunks, runs the models
+    only on chunks whose content hash is new, forgets chunks that disappeared,
+    and rebuilds the document-level results from the stored chunk results.
+    """
+
+    def __init__(self, preprocess=None, max_chars=1000, threshold=0.05):
+        self.preprocess = preprocess
+        self.max_chars = max_chars
+        self.threshold = threshold
+        self._results = {'sentiment': {}, 'emotions': {}, 'entities': {}}
+        self._lock = threading.Lock()
+
+    def _chunks(self, text):
+        chunks = []
+        for _, chunk in split_stable_chunks(text, self.max_chars):
+            if self.preprocess is not None:
+                chunk = self.preprocess(chunk)
+            chunks.append((_chunk_hash(chunk), chunk))
+        return chunks
+
+    def _refresh(self, kind, chunks, analyse):
+        """Analyse the chunks this kind has no result for, and drop stale results."""
+        with self._lock:
+            known = self._results[kind]
+            missing = {key: chunk for key, chunk in chunks if key not in known}
+            if missing:
+                results = analyse(list(missing.values()))
+                for result in results:
+                    if isinstance(result, str):
+                        raise RuntimeError(result)
+                known.update(zip(missing, results))
+            live = {key for key, _ in chunks}
+            for key in [key for key in known if key not in live]:
+                del known[key]
+            return [known[key] for key, _ in chunks]
+
+    def update_stages(self, text):
+        """
+        Bring the stored results up to date with text, one model at a time.
+
+        Yields:
+            tuple: ('sentiment', label), ('emotions', list) and ('entities', list),
+            each as soon as it is ready. Entity offsets are relative to the
+            chunk given by the entity's 'chunk' index.
+        """
+        chunks = self._chunks(text) or [(_chunk_hash(''), '')]
+        weights = [max(len(chunk), 1) for _, chunk in chunks]
+
+        scores = _weighted_scores(self._refresh('sentiment', chunks, sentiment_scores_batch), weights)
+        yield 'sentiment', max(scores, key=scores.get)
+
+        scores = _weighted_scores(self._refresh('emotions', chunks, emotion_scores_batch), weights)
+        yield 'emotions', significant_emotions(scores, self.threshold)
+
+        entities = []
+        for index, chunk_entities in enumerate(self._refresh('entities', chunks, recognize_entities_batch)):
+            entities.extend({**entity, 'chunk': index} for entity in chunk_entities)
+        yield 'entities', entities
+
+    def update(self, text):
+        """Run every stage and return the document-level results as a dict."""
+        return dict(self.update_stages(text))
+
+    def reset(self):
+        with self._lock:
+            for known in self._results.values():
+                known.clear()
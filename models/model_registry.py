@@ -0,0 +1,176 @@
+import gc
+import os
+import threading
+import time
+from models.backends import BACKENDS, load_backend
+
+# Models are loaded on first use; nothing is loaded at import time.
+MODEL_SPECS = {
+    'sentiment': {
+        'task': 'sentiment-analysis',
+        'model': 'distilbert-base-uncased-finetuned-sst-2-english',
+    },
+    'emotion': {
+        'task': 'text-classification',
+        'model': 'j-hartmann/emotion-english-distilroberta-base',
+    },
+    'ner': {
+        'task': 'ner',
+        'model': 'dbmdz/bert-large-cased-finetuned-conll03-english',
+    },
+}
+
+# Optional fused model: one encoder with heads for several tasks, see models.multitask.
+MULTITASK_NAME = 'multitask'
+
+_entries = {}
+_stats = {}
+_backends = {}
+_locks = {name: threading.Lock() for name in [*MODEL_SPECS, MULTITASK_NAME]}
+_multitask_path = os.environ.get('ASAT_MULTITASK_MODEL')
+
+def get_backend(name):
+    """Backend for a model: set_backend, else ASAT_BACKEND_<NAME>, else ASAT_BACKEND, else 'torch'."""
+    return (_backends.get(name)
+            or os.environ.get(f'ASAT_BACKEND_{name.upper()}')
+            or os.environ.get('ASAT_BACKEND', 'torch'))
+
+def set_backend(name, backend):
+    """Choose the backend for a model; it is reloaded with it on next use."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+    _backends[name] = backend
+    unload(name)
+
+def _model_size(model):
+    """Bytes held by the model's parameters and buffers (or its artifact on disk)."""
+    if hasattr(model, 'size_bytes'):
+        return model.size_bytes
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+def _load(name):
+    from transformers import AutoTokenizer
+
+    spec = MODEL_SPECS[name]
+    backend = get_backend(name)
+    started = time.perf_counter()
+    tokenizer = AutoTokenizer.from_pretrained(spec['model'])
+    model = load_backend(spec, backend, tokenizer)
+    entry = {'tokenizer': tokenizer, 'model': model, 'backend': backend}
+    _stats[name] = {
+        'backend': backend,
+        'load_seconds': time.perf_counter() - started,
+        'size_bytes': _model_size(model),
+    }
+    return entry
+
+def _load_multitask():
+    from models.multitask import load_multitask
+
+    started = time.perf_counter()
+    model, tokenizer = load_multitask(_multitask_path)
+    _stats[MULTITASK_NAME] = {
+        'backend': 'torch',
+        'load_seconds': time.perf_counter() - started,
+        'size_bytes': _model_size(model),
+        'tasks': list(model.tasks),
+    }
+    return {'tokenizer': tokenizer, 'model': model, 'backend': 'torch'}
+
+def set_multitask(path):
+    """Serve the tasks a multi-task model has heads for from that model (None to switch back)."""
+    global _multitask_path
+    _multitask_path = path
+    unload(MULTITASK_NAME)
+
+def multitask_path():
+    return _multitask_path
+
+def multitask_tasks():
+    """Tasks answered by the fused multi-task model; empty when none is configured."""
+    if not _multitask_path:
+        return ()
+    return _get_entry(MULTITASK_NAME)['model'].tasks
+
+def _get_entry(name):
+    entry = _entries.get(name)
+    if entry is None:
+        with _locks[name]:
+            entry = _entries.get(name)
+            if entry is None:
+                entry = _entries[name] = _load_multitask() if name == MULTITASK_NAME else _load(name)
+    return entry
+
+def get_model(name):
+    """Return the model (of whichever backend is selected), loading it on first use."""
+    return _get_entry(name)['model']
+
+def get_tokenizer(name):
+    return _get_entry(name)['tokenizer']
+
+def warm_up(names=None, background=True):
+    """
+    Load models ahead of their first use.
+
+    When a multi-task model is configured it is loaded first, and the
+    single-task models it replaces are skipped.
+
+    Args:
+        names (list): Models to load; all of them by default.
+        background (bool): Load in a daemon thread instead of blocking.
+
+    Returns:
+        Thread: The loading thread, or None when loading in the foreground.
+    """
+    names = list(names or MODEL_SPECS)
+
+    def load_all():
+        fused = ()
+        if _multitask_path:
+            try:
+                fused = multitask_tasks()
+            except Exception as e:
+                print(f"Error warming up {MULTITASK_NAME} model: {str(e)}")
+        for name in names:
+            if name in fused:
+                continue
+            try:
+                _get_entry(name)
+            except Exception as e:
+                print(f"Error warming up {name} model: {str(e)}")
+
+    if not background:
+        load_all()
+        return None
+    thread = threading.Thread(target=load_all, name='model-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+def unload(name=None):
+    """Drop one model (or all of them) so its memory can be reclaimed."""
+    names = [name] if name else [*MODEL_SPECS, MULTITASK_NAME]
+    for model_name in names:
+        with _locks[model_name]:
+            _entries.pop(model_name, None)
+    gc.collect()
+
+def is_loaded(name):
+    return name in _entries
+
+def model_stats():
+    """
+    Report load time and resident size for each model.
+
+    Returns:
+        dict: For each model (and the multi-task model, when one is
+        configured), whether it is loaded, the selected backend and, once it
+        has been loaded, 'load_seconds' and 'size_bytes'.
+    """
+    stats = {
+        name: {'loaded': is_loaded(name), 'backend': get_backend(name), **_stats.get(name, {})}
+        for name in MODEL_SPECS
+    }
+    if _multitask_path:
+        stats[MULTITASK_NAME] = {'loaded': is_loaded(MULTITASK_NAME), 'backend': 'torch', **_stats.get(MULTITASK_NAME, {})}
+    return stats
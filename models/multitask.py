@@ -0,0 +1,79 @@
+import json
+import os
+import types
+import torch
+
+CONFIG_NAME = 'multitask.json'
+HEADS_NAME = 'heads.pt'
+ENCODER_DIR = 'encoder'
+
+class MultiTaskModel(torch.nn.Module):
+    """
+    One transformer encoder with a linear head per task.
+
+    Sequence-level heads (sentiment, emotion) read the first token's hidden
+    state; token-level heads (ner) read every token. A forward pass runs the
+    encoder once and only the heads that were asked for.
+
+    Args:
+        encoder: A transformers base model (AutoModel).
+        heads (dict): task -> {'labels': [...], 'level': 'sequence' or 'token',
+            'problem_type': optional, e.g. 'multi_label_classification'}.
+    """
+
+    def __init__(self, encoder, heads):
+        super().__init__()
+        self.encoder = encoder
+        self.head_specs = heads
+        self.heads = torch.nn.ModuleDict({
+            task: torch.nn.Linear(encoder.config.hidden_size, len(spec['labels'])) for task, spec in heads.items()
+        })
+        # Each head's config mirrors what the analyser reads from a single-task model.
+        self.configs = {
+            task: types.SimpleNamespace(id2label=dict(enumerate(spec['labels'])), problem_type=spec.get('problem_type'))
+            for task, spec in heads.items()
+        }
+
+    @property
+    def tasks(self):
+        return tuple(self.heads)
+
+    def forward(self, input_ids, attention_mask, tasks=None):
+        hidden = self.encoder(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+        logits = {}
+        for task in tasks or self.tasks:
+            states = hidden if self.head_specs[task]['level'] == 'token' else hidden[:, 0]
+            logits[task] = self.heads[task](states)
+        return logits
+
+def create_multitask(encoder_name, heads):
+    """A multi-task model on a pretrained encoder with new, untrained heads, ready for fine-tuning."""
+    from transformers import AutoModel, AutoTokenizer
+
+    return MultiTaskModel(AutoModel.from_pretrained(encoder_name), heads), AutoTokenizer.from_pretrained(encoder_name)
+
+def save_multitask(model, tokenizer, path):
+    """Write the encoder, tokenizer, head weights and head config to a directory."""
+    os.makedirs(path, exist_ok=True)
+    model.encoder.save_pretrained(os.path.join(path, ENCODER_DIR))
+    tokenizer.save_pretrained(os.path.join(path, ENCODER_DIR))
+    torch.save(model.heads.state_dict(), os.path.join(path, HEADS_NAME))
+    with open(os.path.join(path, CONFIG_NAME), 'w') as file:
+        json.dump({'heads': model.head_specs}, file, indent=2)
+
+def load_multitask(path):
+    """
+    Load a model written by save_multitask.
+
+    Returns:
+        tuple: (MultiTaskModel in eval mode, tokenizer).
+    """
+    from transformers import AutoModel, AutoTokenizer
+
+    with open(os.path.join(path, CONFIG_NAME), 'r') as file:
+        config = json.load(file)
+    encoder_path = os.path.join(path, ENCODER_DIR)
+    model = MultiTaskModel(AutoModel.from_pretrained(encoder_path), config['heads'])
+    model.heads.load_state_dict(torch.load(os.path.join(path, HEADS_NAME), weights_only=True))
+    model.eval()
+    return model, AutoTokenizer.from_pretrained(encoder_path)
@@ -0,0 +1,149 @@
+import re
+from functools import lru_cache
+import nltk
+from nltk.corpus import stopwords
+from nltk.tokenize import word_tokenize
+from nltk.stem import WordNetLemmatizer
+import contractions
+from models.profiling import stage_timer
+
+DEFAULT_OPTIONS = {
+    'remove_punctuation': False,
+    'convert_to_lowercase': False,
+    'remove_stopwords': False,
+    'remove_urls': False,
+    'remove_mentions': False,
+    'remove_hashtags': False,
+    'remove_numbers': False,
+    'expand_contractions': False,
+    'remove_whitespace': False,
+    'lemmatization': False
+}
+
+URL_PATTERN = r'http\S+|www\S+|https\S+'
+# URLs are removed in a pass of their own first: they start with word
+# characters, so a merged mention or hashtag match could swallow the start of
+# one. These patterns cannot overlap that way, and merging them gives the same
+# result as running the substitutions one after another.
+REMOVAL_PATTERNS = (
+    ('remove_mentions', r'@\w+'),
+    ('remove_hashtags', r'#\w+'),
+    ('remove_numbers', r'\d+'),
+)
+PUNCTUATION_PATTERN = r'[^\w\s]'
+
+def ensure_nltk_data():
+    """Download the NLTK corpora preprocessing needs, if they are missing."""
+    resources = (
+        ('stopwords', 'corpora/stopwords'),
+        ('punkt', 'tokenizers/punkt'),
+        ('punkt_tab', 'tokenizers/punkt_tab'),  # word_tokenize needs this on newer NLTK releases
+        ('wordnet', 'corpora/wordnet'),
+    )
+    for resource, path in resources:
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            nltk.download(resource, quiet=True)
+
+@lru_cache(maxsize=None)
+def _stop_words():
+    return frozenset(stopwords.words('english'))
+
+@lru_cache(maxsize=None)
+def _lemmatizer():
+    return WordNetLemmatizer()
+
+@lru_cache(maxsize=65536)
+def _lemmatize(word):
+    return _lemmatizer().lemmatize(word)
+
+def _option_key(options):
+    return tuple(sorted({**DEFAULT_OPTIONS, **options}.items()))
+
+@lru_cache(maxsize=64)
+def _build(option_key):
+    options = dict(option_key)
+    urls = re.compile(URL_PATTERN) if options['remove_urls'] else None
+    patterns = [pattern for name, pattern in REMOVAL_PATTERNS if options[name]]
+    # Punctuation can join the same pass unless contractions are expanded in between.
+    separate_punctuation = options['remove_punctuation'] and options['expand_contractions']
+    if options['remove_punctuation'] and not separate_punctuation:
+        patterns.append(PUNCTUATION_PATTERN)
+    removal = re.compile('|'.join(patterns)) if patterns else None
+    punctuation = re.compile(PUNCTUATION_PATTERN) if separate_punctuation else None
+    expand = options['expand_contractions']
+    lowercase = options['convert_to_lowercase']
+    remove_stopwords = options['remove_stopwords']
+    remove_whitespace = options['remove_whitespace']
+    lemmatize = options['lemmatization']
+    stop_words = _stop_words() if remove_stopwords else None
+
+    def preprocess(text):
+        if urls is not None:
+            text = urls.sub('', text)
+        if removal is not None:
+            text = removal.sub('', text)
+        if expand:
+            text = contractions.fix(text)
+        if punctuation is not None:
+            text = punctuation.sub('', text)
+        if lowercase:
+            text = text.lower()
+        if remove_stopwords:
+            if lowercase:
+                text = ' '.join([word for word in text.split() if word not in stop_words])
+            else:
+                text = ' '.join([word for word in text.split() if word.lower() not in stop_words])
+        elif remove_whitespace:
+            # Joining the stopword-filtered words has already collapsed whitespace.
+            text = ' '.join(text.split())
+        if lemmatize:
+            text = ' '.join([_lemmatize(word) for word in word_tokenize(text)])
+        return text
+
+    return preprocess
+
+def options_fingerprint(options):
+    """The enabled options as a stable string, e.g. 'remove_urls,remove_whitespace'; '' when none are."""
+    return ','.join(name for name, enabled in _option_key(options or {}) if enabled)
+
+def build_preprocessor(options):
+    """
+    Compile the enabled preprocessing options into a single callable.
+
+    URLs are removed first; the mention, hashtag, number and (usually)
+    punctuation removals then run as one merged regex pass. The stopword set
+    is loaded once and lemmatisation is memoised per word. Compiled pipelines
+    are cached per set of options.
+
+    Args:
+        options (dict): Option name to bool, see DEFAULT_OPTIONS.
+
+    Returns:
+        callable: Takes a string and returns the cleaned string.
+    """
+    return _build(_option_key(options))
+
+def preprocess_text(text, options):
+    """
+    Clean text according to the enabled preprocessing options.
+
+    Args:
+        text (str): Text to clean.
+        options (dict): Option name to bool, see DEFAULT_OPTIONS.
+
+    Returns:
+        str: The cleaned text.
+    """
+    with stage_timer('preprocess') as stage:
+        stage['items'] = 1
+        return build_preprocessor(options)(text)
+
+def preprocess_batch(texts, options):
+    """Clean many texts with one compiled pipeline."""
+    preprocess = build_preprocessor(options)
+    with stage_timer('preprocess') as stage:
+        texts = [preprocess(text) for text in texts]
+        stage['items'] = len(texts)
+        return texts
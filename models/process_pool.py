@@ -0,0 +1,93 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+TASKS = ('sentiment', 'emotion', 'ner')
+DEFAULT_THREADS_PER_WORKER = int(os.environ.get('ASAT_THREADS_PER_WORKER', 1))
+DEFAULT_WORKERS = int(os.environ.get('ASAT_WORKERS', 0)) or max(1, (os.cpu_count() or 1) // DEFAULT_THREADS_PER_WORKER)
+DEFAULT_SHARD_SIZE = 64
+
+_executor = None
+_executor_config = None
+
+def _init_worker(threads_per_worker, tasks):
+    """Runs once in each worker: pin torch's thread count, then load the models."""
+    os.environ['TOKENIZERS_PARALLELISM'] = 'false'
+    import torch
+    torch.set_num_threads(threads_per_worker)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+    from models.model_registry import warm_up
+    warm_up(tasks, background=False)
+
+def _analyse_shard(texts, tasks, batch_size, preprocessing_options=None):
+    from models.batch_runner import analyse_records
+    if preprocessing_options and any(preprocessing_options.values()):
+        from models.preprocessing import preprocess_batch
+        texts = preprocess_batch(texts, preprocessing_options)
+    return analyse_records(texts, tasks, batch_size)
+
+def get_pool(workers=None, threads_per_worker=None, tasks=TASKS):
+    """
+    Return the shared worker pool, starting it if needed.
+
+    Workers are spawned rather than forked so they never inherit torch's
+    thread pools, and keep their models loaded between calls. The pool is
+    restarted when it is asked for with a different configuration.
+    """
+    global _executor, _executor_config
+    workers = workers or DEFAULT_WORKERS
+    threads_per_worker = threads_per_worker or DEFAULT_THREADS_PER_WORKER
+    config = (workers, threads_per_worker, tuple(tasks))
+    if _executor is None or _executor_config != config:
+        shutdown_pool()
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(threads_per_worker, tuple(tasks)),
+        )
+        _executor_config = config
+    return _executor
+
+def shutdown_pool():
+    global _executor, _executor_config
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+        _executor_config = None
+
+def parallel_analyse(texts, tasks=TASKS, workers=None, threads_per_worker=None,
+                     shard_size=DEFAULT_SHARD_SIZE, batch_size=16, preprocessing_options=None):
+    """
+    Analyse texts across a pool of worker processes.
+
+    The texts are split into contiguous shards and results come back in input
+    order. Preprocessing runs in the workers too, so it is not serialised by
+    this process. Small inputs, or a pool of one worker, run in this process
+    instead.
+
+    Args:
+        texts (list): Raw texts.
+        tasks (tuple): Any of 'sentiment', 'emotion' and 'ner'.
+        workers (int): Worker processes; ASAT_WORKERS or one per core by default.
+        threads_per_worker (int): torch intra-op threads in each worker;
+            ASAT_THREADS_PER_WORKER or 1 by default.
+        shard_size (int): Texts sent to a worker at a time.
+        batch_size (int): Number of token windows per forward pass.
+        preprocessing_options (dict): Preprocessing options, see models.preprocessing.
+
+    Returns:
+        list: One result dict per text, as returned by analyse_records.
+    """
+    texts = list(texts)
+    workers = workers or DEFAULT_WORKERS
+    if workers <= 1 or len(texts) <= shard_size:
+        return _analyse_shard(texts, tasks, batch_size, preprocessing_options)
+    pool = get_pool(workers, threads_per_worker, tasks)
+    shards = [texts[start:start + shard_size] for start in range(0, len(texts), shard_size)]
+    results = pool.map(_analyse_shard, shards, repeat(tuple(tasks)), repeat(batch_size), repeat(preprocessing_options))
+    return [record for shard in results for record in shard]
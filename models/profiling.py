@@ -0,0 +1,97 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Timing hooks are cheap enough to leave on; set ASAT_PROFILE=0 to disable them.
+ENABLED = os.environ.get('ASAT_PROFILE', '1') != '0'
+MAX_SAMPLES = 1000
+
+_stages = {}
+_lock = threading.Lock()
+
+def record(stage, seconds, items=0, tokens=0):
+    """Add one timing sample for a stage."""
+    with _lock:
+        entry = _stages.get(stage)
+        if entry is None:
+            entry = _stages[stage] = {
+                'calls': 0, 'seconds': 0.0, 'items': 0, 'tokens': 0,
+                'samples': deque(maxlen=MAX_SAMPLES),
+            }
+        entry['calls'] += 1
+        entry['seconds'] += seconds
+        entry['items'] += items
+        entry['tokens'] += tokens
+        entry['samples'].append(seconds)
+
+@contextmanager
+def stage_timer(stage):
+    """
+    Time a block of code as one call of a stage.
+
+    The block can report how much work it did by setting 'items' (documents,
+    chunks) and 'tokens' on the yielded dict.
+    """
+    counts = {'items': 0, 'tokens': 0}
+    if not ENABLED:
+        yield counts
+        return
+    started = time.perf_counter()
+    try:
+        yield counts
+    finally:
+        record(stage, time.perf_counter() - started, counts['items'], counts['tokens'])
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a list of numbers."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+def stage_stats():
+    """
+    Summarise every stage recorded since the last reset.
+
+    Returns:
+        dict: For each stage, the call count, total seconds, items and tokens
+        processed, throughput, and p50/p95/p99 call latency in milliseconds
+        (over the last MAX_SAMPLES calls).
+    """
+    with _lock:
+        stages = {name: dict(entry, samples=list(entry['samples'])) for name, entry in _stages.items()}
+    summary = {}
+    for name, entry in sorted(stages.items()):
+        seconds = entry['seconds']
+        summary[name] = {
+            'calls': entry['calls'],
+            'seconds': seconds,
+            'items': entry['items'],
+            'tokens': entry['tokens'],
+            'items_per_second': entry['items'] / seconds if seconds else 0.0,
+            'tokens_per_second': entry['tokens'] / seconds if seconds else 0.0,
+            'p50_ms': percentile(entry['samples'], 0.50) * 1000,
+            'p95_ms': percentile(entry['samples'], 0.95) * 1000,
+            'p99_ms': percentile(entry['samples'], 0.99) * 1000,
+        }
+    return summary
+
+def format_stats(stats=None):
+    """One line per stage, for logs and the GUI."""
+    stats = stage_stats() if stats is None else stats
+    return "\n".join(
+        f"{name}: {entry['calls']} calls, {entry['seconds']:.2f}s, "
+        f"{entry['items_per_second']:.1f} items/s, p95 {entry['p95_ms']:.1f} ms"
+        for name, entry in stats.items()
+    )
+
+def write_stats(path):
+    with open(path, 'w') as file:
+        json.dump(stage_stats(), file, indent=2)
+
+def reset_stats():
+    with _lock:
+        _stages.clear()
@@ -0,0 +1,305 @@
+import json
+from collections import Counter
+from models.profiling import stage_timer
+
+PAGE_MARGIN = 50
+LINE_HEIGHT = 14
+FONT = 'Helvetica'
+FONT_SIZE = 10
+# reportlab keeps every finished page in memory until the file is saved, so
+# the PDF lists at most this many documents by default; the summary and the
+# Excel report always cover all of them.
+MAX_PDF_DOCUMENTS = 5000
+EXCEL_MAX_ROWS = 1048576
+EXCEL_MAX_CELL = 32767
+MAX_TRACKED_ENTITIES = 50000
+TOP_ENTITIES = 20
+
+def _decode(value):
+    """Nested results read back from CSV or Parquet output are JSON strings."""
+    if isinstance(value, str) and value[:1] in ('[', '{'):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+def _emotion_pairs(emotions):
+    """(label, score) pairs from a {label: score} dict or a list of {'label', 'score'} dicts."""
+    emotions = _decode(emotions)
+    if isinstance(emotions, dict):
+        return list(emotions.items())
+    if isinstance(emotions, list):
+        return [(emotion['label'], emotion['score']) for emotion in emotions]
+    return []
+
+def _entities(entities):
+    entities = _decode(entities)
+    return entities if isinstance(entities, list) else []
+
+def _error(record):
+    """The first error message among a record's results, if any."""
+    for key in ('sentiment', 'emotions', 'entities'):
+        value = record.get(key)
+        if isinstance(value, str) and value.startswith('Error'):
+            return value
+    return None
+
+def normalise_record(record, index):
+    """
+    Put one analysis result into the shape the report writers use.
+
+    Accepts the GUI's single analysis ({'sentiment', 'emotions', 'entities'})
+    and the batch runner's records, including ones read back from CSV.
+
+    Returns:
+        dict: 'document', 'text', 'sentiment', 'sentiment_score', 'emotions'
+        as (label, score) pairs sorted by score, 'entities' and 'error'.
+    """
+    error = _error(record)
+    return {
+        'document': record.get('document', record.get('row', index)),
+        'text': record.get('text'),
+        'sentiment': None if error and error == record.get('sentiment') else record.get('sentiment'),
+        'sentiment_score': record.get('sentiment_score'),
+        'emotions': sorted(_emotion_pairs(record.get('emotions')), key=lambda pair: pair[1], reverse=True),
+        'entities': _entities(record.get('entities')),
+        'error': error,
+    }
+
+class ReportSummary:
+    """Running totals over every document in a report, in constant memory."""
+
+    def __init__(self):
+        self.documents = 0
+        self.errors = 0
+        self.sentiments = Counter()
+        self.top_emotions = Counter()
+        self.emotion_totals = Counter()
+        self.entity_groups = Counter()
+        self.entity_words = Counter()
+
+    def add(self, document):
+        self.documents += 1
+        if document['error']:
+            self.errors += 1
+        if document['sentiment']:
+            self.sentiments[document['sentiment']] += 1
+        if document['emotions']:
+            self.top_emotions[document['emotions'][0][0]] += 1
+            for label, score in document['emotions']:
+                self.emotion_totals[label] += score
+        for entity in document['entities']:
+            self.entity_groups[entity['entity_group']] += 1
+            self.entity_words[(entity['entity_group'], entity['word'])] += 1
+        if len(self.entity_words) > MAX_TRACKED_ENTITIES:
+            # Keep the counter bounded; rare entities are dropped, frequent ones stay exact enough.
+            self.entity_words = Counter(dict(self.entity_words.most_common(MAX_TRACKED_ENTITIES // 5)))
+
+    def lines(self):
+        """The summary as (heading, [lines]) sections."""
+        documents = self.documents or 1
+        sections = [('Documents', [f"Analysed: {self.documents}", f"With errors: {self.errors}"])]
+        sections.append(('Sentiment', [
+            f"{label}: {count} ({count / documents:.1%})" for label, count in self.sentiments.most_common()
+        ]))
+        sections.append(('Emotions (mean score, documents where top)', [
+            f"{label}: {total / documents:.2f}, {self.top_emotions[label]}"
+            for label, total in self.emotion_totals.most_common()
+        ]))
+        sections.append(('Entity Types', [f"{group}: {count}" for group, count in self.entity_groups.most_common()]))
+        sections.append(('Most Frequent Entities', [
+            f"{group}: {word} ({count})" for (group, word), count in self.entity_words.most_common(TOP_ENTITIES)
+        ]))
+        return sections
+
+class _PdfPages:
+    """Draws wrapped lines top to bottom, starting a new numbered page when one fills up."""
+
+    def __init__(self, filename):
+        from reportlab.lib.pagesizes import letter
+        from reportlab.pdfgen import canvas
+
+        self.canvas = canvas.Canvas(filename, pagesize=letter, pageCompression=1)
+        self.width, self.height = letter
+        self.page = 1
+        self._start_page()
+
+    def _start_page(self):
+        self.canvas.setFont(FONT, FONT_SIZE)
+        self.y = self.height - PAGE_MARGIN
+
+    def new_page(self):
+        self.canvas.drawRightString(self.width - PAGE_MARGIN, PAGE_MARGIN / 2, f"Page {self.page}")
+        self.canvas.showPage()
+        self.page += 1
+        self._start_page()
+
+    def line(self, text, indent=0, bold=False):
+        from reportlab.lib.utils import simpleSplit
+
+        font = FONT + '-Bold' if bold else FONT
+        width = self.width - 2 * PAGE_MARGIN - indent
+        for part in simpleSplit(str(text), font, FONT_SIZE, width) or ['']:
+            if self.y < PAGE_MARGIN:
+                self.new_page()
+            self.canvas.setFont(font, FONT_SIZE)
+            self.canvas.drawString(PAGE_MARGIN + indent, self.y, part)
+            self.y -= LINE_HEIGHT
+
+    def gap(self):
+        self.y -= LINE_HEIGHT / 2
+
+    def save(self):
+        self.canvas.drawRightString(self.width - PAGE_MARGIN, PAGE_MARGIN / 2, f"Page {self.page}")
+        self.canvas.save()
+
+def write_pdf_report(records, filename, title="Sentiment Analysis Report", max_documents=MAX_PDF_DOCUMENTS):
+    """
+    Write a paginated PDF report from an iterable of analysis results.
+
+    Records are consumed one at a time. The first max_documents are listed
+    with their sentiment, emotions and entities; a summary over all of them
+    follows at the end.
+
+    Args:
+        records (iterable): Result dicts, see normalise_record.
+        filename (str): PDF file to write.
+        title (str): Heading on the first page.
+        max_documents (int): Documents listed individually; None for all.
+
+    Returns:
+        int: Number of documents in the report.
+    """
+    with stage_timer('report.pdf') as counts:
+        pages = _PdfPages(filename)
+        summary = ReportSummary()
+        pages.line(title, bold=True)
+        pages.gap()
+        for index, record in enumerate(records):
+            document = normalise_record(record, index)
+            summary.add(document)
+            if max_documents is not None and index >= max_documents:
+                continue
+            pages.line(f"Document: {document['document']}", bold=True)
+            if document['error']:
+                pages.line(document['error'], indent=10)
+            if document['sentiment']:
+                score = f" ({document['sentiment_score']:.2f})" if document['sentiment_score'] is not None else ''
+                pages.line(f"Sentiment: {document['sentiment']}{score}", indent=10)
+            if document['emotions']:
+                pages.line("Emotions: " + ", ".join(f"{label}: {score:.2f}" for label, score in document['emotions']), indent=10)
+            for entity in document['entities']:
+                pages.line(f"{entity['entity_group']}: {entity['word']} (score: {entity['score']:.2f})", indent=10)
+            pages.gap()
+        if max_documents is not None and summary.documents > max_documents:
+            pages.line(f"{summary.documents - max_documents} more documents are included in the summary only.")
+        pages.new_page()
+        pages.line("Summary", bold=True)
+        for heading, lines in summary.lines():
+            pages.gap()
+            pages.line(heading, bold=True)
+            for line in lines:
+                pages.line(line, indent=10)
+        pages.save()
+        counts['items'] = summary.documents
+    return summary.documents
+
+class _SheetSeries:
+    """A write-only sheet that continues on 'Name (2)', 'Name (3)', ... when it reaches Excel's row limit."""
+
+    def __init__(self, workbook, title, header):
+        self.workbook = workbook
+        self.title = title
+        self.header = header
+        self.sheets = 0
+        self._next_sheet()
+
+    def _next_sheet(self):
+        self.sheets += 1
+        title = self.title if self.sheets == 1 else f"{self.title} ({self.sheets})"
+        self.sheet = self.workbook.create_sheet(title)
+        self.sheet.append(self.header)
+        self.rows = 1
+
+    def append(self, row):
+        if self.rows >= EXCEL_MAX_ROWS:
+            self._next_sheet()
+        self.sheet.append(row)
+        self.rows += 1
+
+def _cell(text):
+    if text is None:
+        return None
+    return str(text)[:EXCEL_MAX_CELL]
+
+def write_excel_report(records, filename):
+    """
+    Write an Excel report from an iterable of analysis results.
+
+    The workbook is opened in openpyxl's write-only mode, so rows are streamed
+    to disk as records are consumed instead of being held in memory.
+
+    Sheets:
+        Summary: totals over all documents.
+        Documents: one row per document.
+        Entities: one row per recognised entity.
+
+    Args:
+        records (iterable): Result dicts, see normalise_record.
+        filename (str): .xlsx file to write.
+
+    Returns:
+        int: Number of documents in the report.
+    """
+    from openpyxl import Workbook
+
+    with stage_timer('report.excel') as counts:
+        workbook = Workbook(write_only=True)
+        summary_sheet = workbook.create_sheet('Summary')
+        documents = _SheetSeries(workbook, 'Documents', [
+            'Document', 'Sentiment', 'Sentiment Score', 'Top Emotion', 'Top Emotion Score', 'Emotions', 'Entities', 'Error', 'Text',
+        ])
+        entities = _SheetSeries(workbook, 'Entities', ['Document', 'Entity Type', 'Entity', 'Score'])
+        summary = ReportSummary()
+        for index, record in enumerate(records):
+            document = normalise_record(record, index)
+            summary.add(document)
+            top_label, top_score = document['emotions'][0] if document['emotions'] else (None, None)
+            documents.append([
+                _cell(document['document']),
+                document['sentiment'],
+                document['sentiment_score'],
+                top_label,
+                top_score,
+                ", ".join(f"{label}: {score:.2f}" for label, score in document['emotions']),
+                len(document['entities']),
+                document['error'],
+                _cell(document['text']),
+            ])
+            for entity in document['entities']:
+                entities.append([_cell(document['document']), entity['entity_group'], entity['word'], entity['score']])
+        for heading, lines in summary.lines():
+            summary_sheet.append([heading])
+            for line in lines:
+                summary_sheet.append([None, line])
+            summary_sheet.append([])
+        workbook.save(filename)
+        counts['items'] = summary.documents
+    return summary.documents
+
+def iter_result_records(path, chunksize=1000):
+    """
+    Stream the records of a batch runner output (JSONL, CSV or a Parquet part directory).
+
+    Args:
+        path (str): Output written by models.batch_runner.run_batch.
+        chunksize (int): Rows read at a time.
+
+    Yields:
+        dict: One result record per row.
+    """
+    from models.data_loader import iter_data
+
+    for chunk in iter_data(path, chunksize=chunksize):
+        yield from chunk.astype(object).where(chunk.notna(), None).to_dict('records')
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+class ResultCache:
+    """
+    Two-tier cache for inference results.
+
+    Results are keyed on a hash of the task, the model and the (already
+    preprocessed) text. The in-memory tier is a bounded LRU; the optional
+    SQLite tier keeps results across restarts. Values must be JSON
+    serialisable.
+    """
+
+    def __init__(self, max_entries=10000, path=None):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if path:
+            self.open_disk(path)
+
+    @staticmethod
+    def make_key(task, model, text):
+        return hashlib.sha256(f"{task}\0{model}\0{text}".encode('utf-8')).hexdigest()
+
+    def open_disk(self, path):
+        """Attach (or replace) the on-disk tier at the given SQLite path."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+            # Worker processes may share one cache file, so wait for their write locks.
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._db.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            self._db.commit()
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_many(self, keys):
+        """Look up several keys at once; missing entries come back as None."""
+        results = [None] * len(keys)
+        with self._lock:
+            on_disk = []
+            for i, key in enumerate(keys):
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    results[i] = self._entries[key]
+                    self.hits += 1
+                else:
+                    on_disk.append(i)
+            if on_disk and self._db is not None:
+                wanted = list({keys[i] for i in on_disk})
+                found = {}
+                for start in range(0, len(wanted), 500):
+                    batch = wanted[start:start + 500]
+                    placeholders = ','.join('?' * len(batch))
+                    rows = self._db.execute(f'SELECT key, value FROM results WHERE key IN ({placeholders})', batch)
+                    found.update((key, json.loads(value)) for key, value in rows)
+                for i in on_disk:
+                    if keys[i] in found:
+                        results[i] = found[keys[i]]
+                        self._remember(keys[i], results[i])
+                        self.disk_hits += 1
+            self.misses += sum(result is None for result in results)
+        return results
+
+    def put_many(self, items):
+        """Store (key, value) pairs in both tiers, writing the disk tier in one transaction."""
+        items = list(items)
+        with self._lock:
+            for key, value in items:
+                self._remember(key, value)
+            if self._db is not None and items:
+                with self._db:
+                    self._db.executemany(
+                        'INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)',
+                        [(key, json.dumps(value)) for key, value in items],
+                    )
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def put(self, key, value):
+        self.put_many([(key, value)])
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+        }
+
+    def clear(self, disk=False):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+            if disk and self._db is not None:
+                with self._db:
+                    self._db.execute('DELETE FROM results')
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
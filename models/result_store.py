@@ -0,0 +1,370 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+DEFAULT_PATH = os.environ.get('ASAT_RESULTS_PATH', os.path.join(os.path.expanduser('~'), '.cache', 'asat', 'results.db'))
+PERIOD_FORMATS = {'hour': '%Y-%m-%d %H:00', 'day': '%Y-%m-%d', 'week': '%Y-%W', 'month': '%Y-%m'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL,
+    source TEXT,
+    created_at TEXT NOT NULL,
+    text TEXT,
+    sentiment TEXT,
+    sentiment_score REAL,
+    sentiment_value REAL,
+    top_emotion TEXT,
+    model TEXT,
+    backend TEXT,
+    preprocessing TEXT
+);
+CREATE TABLE IF NOT EXISTS emotions (
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    label TEXT NOT NULL,
+    score REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entities (
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    entity_group TEXT NOT NULL,
+    word TEXT NOT NULL,
+    score REAL,
+    char_start INTEGER,
+    char_end INTEGER
+);
+CREATE INDEX IF NOT EXISTS documents_created_at ON documents (created_at);
+CREATE INDEX IF NOT EXISTS documents_sentiment ON documents (sentiment, created_at);
+CREATE INDEX IF NOT EXISTS documents_hash ON documents (hash);
+CREATE INDEX IF NOT EXISTS documents_source ON documents (source, created_at);
+CREATE INDEX IF NOT EXISTS emotions_document ON emotions (document_id);
+CREATE INDEX IF NOT EXISTS emotions_label ON emotions (label, score);
+CREATE INDEX IF NOT EXISTS entities_document ON entities (document_id);
+CREATE INDEX IF NOT EXISTS entities_group ON entities (entity_group, word);
+"""
+
+# The analysis fields of a stored record, as returned by models.batch_runner.analyse_records.
+RESULT_FIELDS = ('sentiment', 'sentiment_score', 'emotions', 'entities')
+
+# What produced a stored result; a stored result is only reused for the same values.
+PROVENANCE_FIELDS = ('model', 'backend', 'preprocessing')
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def _timestamp(value):
+    """ISO 'YYYY-MM-DD HH:MM:SS' text, which sorts and groups correctly in SQLite."""
+    if value is None:
+        value = datetime.now()
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if hasattr(value, 'to_pydatetime'):
+        value = value.to_pydatetime()
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+def sentiment_value(record):
+    """
+    Signed sentiment from -1 (negative) to 1 (positive), as in models.trends.signed_score.
+
+    The sentiment model is binary, so POSITIVE - NEGATIVE follows from the
+    top label's probability.
+    """
+    label, score = record.get('sentiment'), record.get('sentiment_score')
+    if score is None or label not in ('POSITIVE', 'NEGATIVE'):
+        return None
+    value = 2 * score - 1
+    return value if label == 'POSITIVE' else -value
+
+def _emotions(record):
+    emotions = record.get('emotions')
+    if isinstance(emotions, dict):
+        return sorted(emotions.items(), key=lambda pair: pair[1], reverse=True)
+    if isinstance(emotions, list):
+        return [(emotion['label'], emotion['score']) for emotion in emotions]
+    return []
+
+class ResultStore:
+    """
+    Persistent, indexed store of per-document analysis results.
+
+    Each document row holds the text's hash, its source, a timestamp and its
+    sentiment; emotion scores and entities go in their own tables. Rows are
+    written in bulk transactions, and trends, reports and already-analysed
+    documents are answered by indexed queries instead of re-running the models.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute('PRAGMA foreign_keys = ON')
+        if path != ':memory:':
+            # Readers (the GUI, reports) do not block the writer and vice versa.
+            self._db.execute('PRAGMA journal_mode = WAL')
+            self._db.execute('PRAGMA synchronous = NORMAL')
+        self._db.executescript(SCHEMA)
+        # Stores written before provenance was recorded gain the columns; their rows are never reused.
+        columns = {row[1] for row in self._db.execute('PRAGMA table_info(documents)')}
+        with self._db:
+            for column in PROVENANCE_FIELDS:
+                if column not in columns:
+                    self._db.execute(f'ALTER TABLE documents ADD COLUMN {column} TEXT')
+
+    def add_many(self, texts, records, source=None, dates=None, keep_text=True, provenance=None):
+        """
+        Store analysis results for many documents in one transaction.
+
+        Args:
+            texts (list): The analysed texts.
+            records (list): Their results, as returned by
+                models.batch_runner.analyse_records (the GUI's single-analysis
+                dict with an emotion {label: score} dict works too).
+            source (str or list): Where the documents came from, for all or each of them.
+            dates (list): Timestamp of each document; now by default.
+            keep_text (bool): Store the text itself, not only its hash.
+            provenance (dict): 'model', 'backend' and 'preprocessing' the
+                results were computed with, see
+                models.batch_runner.result_provenance. Rows without it are
+                never reused by lookup.
+
+        Returns:
+            list: The new document ids.
+        """
+        texts = list(texts)
+        records = list(records)
+        sources = source if isinstance(source, (list, tuple)) else [source] * len(texts)
+        dates = list(dates) if dates is not None else [None] * len(texts)
+        provenance = [(provenance or {}).get(field) for field in PROVENANCE_FIELDS]
+        ids = []
+        with self._lock, self._db:
+            for text, record, document_source, date in zip(texts, records, sources, dates):
+                emotions = _emotions(record)
+                sentiment = record.get('sentiment')
+                if isinstance(sentiment, str) and sentiment.startswith('Error'):
+                    sentiment = None
+                cursor = self._db.execute(
+                    'INSERT INTO documents (hash, source, created_at, text, sentiment, sentiment_score, sentiment_value,'
+                    ' top_emotion, model, backend, preprocessing) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (text_hash(text), document_source, _timestamp(date), text if keep_text else None, sentiment,
+                     record.get('sentiment_score'), sentiment_value(record), emotions[0][0] if emotions else None,
+                     *provenance),
+                )
+                ids.append(cursor.lastrowid)
+            self._db.executemany(
+                'INSERT INTO emotions (document_id, label, score) VALUES (?, ?, ?)',
+                [(document_id, label, score) for document_id, record in zip(ids, records) for label, score in _emotions(record)],
+            )
+            self._db.executemany(
+                'INSERT INTO entities (document_id, entity_group, word, score, char_start, char_end) VALUES (?, ?, ?, ?, ?, ?)',
+                [
+                    (document_id, entity['entity_group'], entity['word'], entity.get('score'), entity.get('start'), entity.get('end'))
+                    for document_id, record in zip(ids, records) if isinstance(record.get('entities'), list)
+                    for entity in record['entities']
+                ],
+            )
+        return ids
+
+    def _query(self, sql, parameters=()):
+        with self._lock:
+            return self._db.execute(sql, parameters).fetchall()
+
+    @staticmethod
+    def _filters(source=None, start=None, end=None, label=None):
+        clauses, parameters = [], []
+        if source is not None:
+            clauses.append('source = ?')
+            parameters.append(source)
+        if start is not None:
+            clauses.append('created_at >= ?')
+            parameters.append(_timestamp(start))
+        if end is not None:
+            clauses.append('created_at < ?')
+            parameters.append(_timestamp(end))
+        if label is not None:
+            clauses.append('sentiment = ?')
+            parameters.append(label)
+        return clauses, parameters
+
+    def lookup(self, texts, provenance):
+        """
+        The most recent stored result for each text, by hash.
+
+        Only results computed the same way are returned: the raw text's hash
+        says nothing about the model, backend or preprocessing used.
+
+        Args:
+            texts (list): Raw texts, as passed to add_many.
+            provenance (dict): 'model', 'backend' and 'preprocessing' the
+                results must match, see add_many.
+
+        Returns:
+            list: A record (see iter_records) or None for each text.
+        """
+        hashes = [text_hash(text) for text in texts]
+        found = {}
+        unique = list(set(hashes))
+        matching = [provenance.get(field) for field in PROVENANCE_FIELDS]
+        if None in matching:
+            return [None] * len(hashes)
+        for offset in range(0, len(unique), 500):
+            batch = unique[offset:offset + 500]
+            rows = self._query(
+                f"SELECT hash, MAX(id) FROM documents WHERE hash IN ({','.join('?' * len(batch))})"
+                " AND model = ? AND backend = ? AND preprocessing = ? GROUP BY hash", batch + matching)
+            found.update(rows)
+        records = {record['id']: record for record in self._records(list(found.values()))}
+        return [records.get(found.get(key)) for key in hashes]
+
+    def analyse_new(self, texts, analyse, provenance, source=None, dates=None):
+        """
+        Results for many documents, reusing those already stored.
+
+        Texts with a stored sentiment from the same model, backend and
+        preprocessing are looked up by hash; only the rest are passed to
+        analyse, and only their results are added, so loading the same
+        documents again neither re-runs the models nor stores them twice.
+
+        Args:
+            texts (list): Documents to analyse.
+            analyse (callable): Takes a list of texts, returns a list of result dicts.
+            provenance (dict): How analyse computes its results, see add_many.
+            source (str or list): As for add_many.
+            dates (list): As for add_many.
+
+        Returns:
+            tuple: (one result per text, number reused from the store). Each
+            result has the 'id' of its stored document.
+        """
+        texts = list(texts)
+        stored = self.lookup(texts, provenance)
+        new = [index for index, record in enumerate(stored) if record is None or record['sentiment'] is None]
+        records = [None if record is None else {key: record[key] for key in ('id', *RESULT_FIELDS)} for record in stored]
+        if new:
+            for index, record in zip(new, analyse([texts[index] for index in new])):
+                records[index] = record
+            ids = self.add_many(
+                [texts[index] for index in new], [records[index] for index in new],
+                source=[source[index] for index in new] if isinstance(source, (list, tuple)) else source,
+                dates=[dates[index] for index in new] if dates is not None else None,
+                provenance=provenance,
+            )
+            for index, document_id in zip(new, ids):
+                records[index] = {**records[index], 'id': document_id}
+        return records, len(texts) - len(new)
+
+    def trend(self, period='day', source=None, start=None, end=None):
+        """
+        Sentiment aggregated per period.
+
+        Args:
+            period (str): 'hour', 'day', 'week' or 'month'.
+
+        Returns:
+            list: (period, documents, mean signed sentiment, share positive) tuples in time order.
+        """
+        clauses, parameters = self._filters(source, start, end)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        return self._query(
+            f"SELECT strftime('{PERIOD_FORMATS[period]}', created_at) AS period, COUNT(*), AVG(sentiment_value),"
+            f" AVG(sentiment = 'POSITIVE') FROM documents {where} GROUP BY period ORDER BY period",
+            parameters,
+        )
+
+    def sentiment_series(self, source=None, start=None, end=None):
+        """
+        Timestamp, signed sentiment and label of every scored document, oldest first.
+
+        Returns:
+            tuple: (dates, values, labels) lists, ready for SentimentTrendStore.append.
+        """
+        clauses, parameters = self._filters(source, start, end)
+        clauses.append('sentiment_value IS NOT NULL')
+        rows = self._query(
+            f"SELECT created_at, sentiment_value, sentiment FROM documents WHERE {' AND '.join(clauses)} ORDER BY created_at",
+            parameters,
+        )
+        return [row[0] for row in rows], [row[1] for row in rows], [row[2] for row in rows]
+
+    def _records(self, ids):
+        """Full records for the given document ids, in id order."""
+        records = {}
+        for offset in range(0, len(ids), 500):
+            batch = ids[offset:offset + 500]
+            placeholders = ','.join('?' * len(batch))
+            for row in self._query(
+                    'SELECT id, source, created_at, text, sentiment, sentiment_score FROM documents'
+                    f' WHERE id IN ({placeholders})', batch):
+                records[row[0]] = {
+                    'id': row[0], 'document': row[1] or row[0], 'date': row[2], 'text': row[3],
+                    'sentiment': row[4], 'sentiment_score': row[5], 'emotions': [], 'entities': [],
+                }
+            for document_id, label, score in self._query(
+                    f'SELECT document_id, label, score FROM emotions WHERE document_id IN ({placeholders})', batch):
+                records[document_id]['emotions'].append({'label': label, 'score': score})
+            for document_id, group, word, score, start, end in self._query(
+                    'SELECT document_id, entity_group, word, score, char_start, char_end FROM entities'
+                    f' WHERE document_id IN ({placeholders})', batch):
+                records[document_id]['entities'].append(
+                    {'entity_group': group, 'word': word, 'score': score, 'start': start, 'end': end})
+        return [records[document_id] for document_id in sorted(records)]
+
+    def iter_records(self, source=None, start=None, end=None, label=None, chunksize=1000):
+        """
+        Stream stored results, oldest first, in the shape models.reports expects.
+
+        Documents are fetched a page at a time by id, so memory stays bounded.
+
+        Yields:
+            dict: 'id', 'document' (the source), 'date', 'text', 'sentiment',
+            'sentiment_score', 'emotions' and 'entities'.
+        """
+        clauses, parameters = self._filters(source, start, end, label)
+        last_id = 0
+        while True:
+            rows = self._query(
+                f"SELECT id FROM documents WHERE {' AND '.join(clauses + ['id > ?'])} ORDER BY id LIMIT ?",
+                parameters + [last_id, chunksize],
+            )
+            if not rows:
+                return
+            ids = [row[0] for row in rows]
+            yield from self._records(ids)
+            last_id = ids[-1]
+
+    def last_id(self):
+        """The newest document id, or 0 for an empty store."""
+        return self._query('SELECT COALESCE(MAX(id), 0) FROM documents')[0][0]
+
+    def discard_after(self, document_id, source):
+        """Delete documents from a source stored after the given id, with their emotions and entities."""
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM documents WHERE id > ? AND source = ?', (document_id, source))
+
+    def iter_documents(self, ids, count=None, chunksize=1000):
+        """
+        Stream the stored records for the given document ids, in their order.
+
+        Args:
+            ids (sequence): Document ids, e.g. an array('q') kept by a run.
+            count (int): Only the first count ids; all by default.
+            chunksize (int): Documents fetched at a time.
+
+        Yields:
+            dict: As for iter_records; an id listed twice is yielded twice.
+        """
+        count = len(ids) if count is None else count
+        for offset in range(0, count, chunksize):
+            batch = list(ids[offset:min(offset + chunksize, count)])
+            records = {record['id']: record for record in self._records(sorted(set(batch)))}
+            yield from (records[document_id] for document_id in batch if document_id in records)
+
+    def count(self):
+        return self._query('SELECT COUNT(*) FROM documents')[0][0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -1,107 +1,445 @@
-from transformers import pipeline, AutoTokenizer
-import matplotlib.pyplot as plt
-from datetime import datetime
-
-# Load pre-trained models
-nlp = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
-emotion_model = pipeline("text-classification", model="j-hartmann/emotion-english-distilroberta-base", top_k=None)
-ner_model = pipeline("ner", model="dbmdz/bert-large-cased-finetuned-conll03-english", aggregation_strategy="simple")
-
-# Load tokenizers
-sentiment_tokenizer = AutoTokenizer.from_pretrained("distilbert-base-uncased-finetuned-sst-2-english")
-emotion_tokenizer = AutoTokenizer.from_pretrained("j-hartmann/emotion-english-distilroberta-base")
-ner_tokenizer = AutoTokenizer.from_pretrained("dbmdz/bert-large-cased-finetuned-conll03-english")
-
-def chunk_text(text, tokenizer, chunk_size=512):
-    tokens = tokenizer(text, return_tensors='pt', truncation=True, padding=True, max_length=chunk_size)
-    for i in range(0, len(tokens['input_ids'][0]), chunk_size):
-        chunk = tokens['input_ids'][0][i:i + chunk_size]
-        yield tokenizer.decode(chunk, skip_special_tokens=True)
+import torch
+import os
+from models.model_registry import MODEL_SPECS, MULTITASK_NAME, get_backend, get_model, get_tokenizer, multitask_path, multitask_tasks
+from models.result_cache import ResultCache
+from models.profiling import stage_timer
 
-def analyse_sentiment(text):
-    sentiments = []
+DEFAULT_BATCH_SIZE = 16
+DEFAULT_STRIDE = 64
+TASKS = ('sentiment', 'emotion', 'ner')
+
+# Shared by every analysis call; set ASAT_CACHE_PATH to keep results across restarts.
+result_cache = ResultCache(path=os.environ.get('ASAT_CACHE_PATH'))
+
+def set_result_cache(cache):
+    """Replace the cache used by the analysis functions."""
+    global result_cache
+    result_cache = cache
+
+def model_identity(task, fused=None):
+    """
+    The model and backend that answer a task.
+
+    Returns:
+        tuple: (model name, or 'multitask:<path>' for the fused model; backend).
+    """
+    fused = multitask_tasks() if fused is None else fused
+    if task in fused:
+        return f"{MULTITASK_NAME}:{os.path.abspath(multitask_path())}", 'torch'
+    return MODEL_SPECS[task]['model'], get_backend(task)
+
+def _cache_model_name(task, fused):
+    model, backend = model_identity(task, fused)
+    if task in fused:
+        return model
+    # Quantized and ONNX outputs differ slightly from eager ones, so the backend is part of the key.
+    return f"{model}:{backend}"
+
+def _cached_tasks(tasks, texts, batch_size):
+    """
+    Serve results from the cache and compute the rest in one scheduling pass.
+
+    Identical texts are computed once, and only for the tasks they are
+    missing from.
+
+    Returns:
+        dict: task -> list of results, one per text.
+    """
+    fused = multitask_tasks()
+    results, pending = {}, {}
+    for task in tasks:
+        model_name = _cache_model_name(task, fused)
+        keys = [result_cache.make_key(task, model_name, text) for text in texts]
+        results[task] = result_cache.get_many(keys)
+        missing = {text: key for key, text, result in zip(keys, texts, results[task]) if result is None}
+        if missing:
+            pending[task] = missing
+    if pending:
+        computed = _run_tasks({task: list(missing) for task, missing in pending.items()}, batch_size, fused)
+        result_cache.put_many(
+            (key, computed[task][text]) for task, missing in pending.items() for text, key in missing.items()
+        )
+        for task in pending:
+            results[task] = [computed[task][text] if result is None else result for text, result in zip(texts, results[task])]
+    return results
+
+def _special_prefix_length(tokenizer):
+    """Number of special tokens the tokenizer puts in front of a single sequence."""
+    return tokenizer.build_inputs_with_special_tokens([-1]).index(-1)
+
+def chunk_text(text, tokenizer, chunk_size=512, stride=DEFAULT_STRIDE):
+    """
+    Split text into overlapping windows of token IDs.
+
+    The text is tokenized once and never truncated. Each window holds at most
+    chunk_size tokens including special tokens, and neighbouring windows share
+    `stride` tokens. Every token is owned by exactly one window (the one where
+    it sits furthest from an edge), which is what aggregation counts.
+
+    Args:
+        text (str): Text to split.
+        tokenizer: Fast tokenizer matching the model.
+        chunk_size (int): Maximum window length in tokens.
+        stride (int): Number of tokens shared by neighbouring windows.
+
+    Yields:
+        dict: 'input_ids' with special tokens added, 'prefix' (number of leading
+        special tokens), 'start' (index of the first text token), 'offsets'
+        (character span of each text token) and 'owned' (token index range).
+    """
+    encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+    ids = encoding['input_ids']
+    offsets = encoding['offset_mapping']
+    window = chunk_size - tokenizer.num_special_tokens_to_add()
+    stride = min(stride, window // 2)
+    step = window - stride
+    prefix = _special_prefix_length(tokenizer)
+    start = 0
+    while True:
+        end = min(start + window, len(ids))
+        own_start = start if start == 0 else start + stride // 2
+        own_end = end if end == len(ids) else end - (stride - stride // 2)
+        yield {
+            'input_ids': tokenizer.build_inputs_with_special_tokens(ids[start:end]),
+            'prefix': prefix,
+            'start': start,
+            'offsets': offsets[start:end],
+            'owned': (own_start, own_end),
+        }
+        if end >= len(ids):
+            break
+        start += step
+
+def _split_documents(texts, tokenizer):
+    """Chunk every document, remembering which document each chunk came from."""
+    chunks, owners = [], []
+    for doc_index, text in enumerate(texts):
+        for chunk in chunk_text(text, tokenizer):
+            chunks.append(chunk)
+            owners.append(doc_index)
+    return chunks, owners
+
+def _to_probabilities(logits, config):
+    if getattr(config, 'problem_type', None) == 'multi_label_classification':
+        return torch.sigmoid(logits)
+    return torch.softmax(logits, dim=-1)
+
+def _padded_batches(tokenizer, chunks, batch_size):
+    """
+    Padded batches of token windows of similar length.
+
+    Sorting by length before batching keeps the padding in each batch small.
+
+    Yields:
+        tuple: (chunk indices, encoded batch).
+    """
+    order = sorted(range(len(chunks)), key=lambda i: len(chunks[i]['input_ids']))
+    for batch_start in range(0, len(order), batch_size):
+        batch = order[batch_start:batch_start + batch_size]
+        yield batch, tokenizer.pad({'input_ids': [chunks[i]['input_ids'] for i in batch]}, return_tensors='pt')
+
+def _run_bucketed(model, tokenizer, chunks, batch_size):
+    """Run token windows through a model; per-chunk probabilities come back in chunk order."""
+    results = [None] * len(chunks)
+    with torch.no_grad():
+        for batch, encoded in _padded_batches(tokenizer, chunks, batch_size):
+            logits = model(input_ids=encoded['input_ids'], attention_mask=encoded['attention_mask']).logits
+            probabilities = _to_probabilities(logits, model.config)
+            for row, chunk_index in enumerate(batch):
+                results[chunk_index] = probabilities[row]
+    return results
+
+def _run_bucketed_heads(model, tokenizer, chunks, batch_size, tasks):
+    """Like _run_bucketed for a MultiTaskModel: one encoder pass per batch feeds every requested head."""
+    results = {task: [None] * len(chunks) for task in tasks}
+    with torch.no_grad():
+        for batch, encoded in _padded_batches(tokenizer, chunks, batch_size):
+            logits = model(input_ids=encoded['input_ids'], attention_mask=encoded['attention_mask'], tasks=tasks)
+            for task in tasks:
+                probabilities = _to_probabilities(logits[task], model.configs[task])
+                for row, chunk_index in enumerate(batch):
+                    results[task][chunk_index] = probabilities[row]
+    return results
+
+def _owned_weight(chunk):
+    own_start, own_end = chunk['owned']
+    return max(own_end - own_start, 1)
+
+def _chunk_documents(stage_name, tokenizer, texts):
+    with stage_timer(f'chunk_text.{stage_name}') as stage:
+        chunks, owners = _split_documents(texts, tokenizer)
+        stage['items'] = len(texts)
+        stage['tokens'] = sum(len(chunk['input_ids']) for chunk in chunks)
+    return chunks, owners
+
+def _aggregate_classes(task, texts, chunks, owners, outputs, id2label):
+    """Token-weighted average of window probabilities for each document."""
+    with stage_timer(f'aggregate.{task}') as stage:
+        stage['items'] = len(texts)
+        totals = [None] * len(texts)
+        weights = [0] * len(texts)
+        for chunk, owner, probabilities in zip(chunks, owners, outputs):
+            weight = _owned_weight(chunk)
+            weighted = probabilities * weight
+            totals[owner] = weighted if totals[owner] is None else totals[owner] + weighted
+            weights[owner] += weight
+        return [
+            {id2label[i]: float(score) for i, score in enumerate(total / weight)}
+            for total, weight in zip(totals, weights)
+        ]
+
+def _entity_tag(label):
+    if label.startswith('B-') or label.startswith('I-'):
+        return label[0], label[2:]
+    return 'I', label
+
+def _group_entities(text, tokens, id2label):
+    """Merge per-token predictions into entity spans (the pipeline's "simple" strategy)."""
+    entities = []
+    group = None
+    for probabilities, (char_start, char_end) in tokens:
+        score, label_id = probabilities.max(dim=-1)
+        bi, tag = _entity_tag(id2label[int(label_id)])
+        if group is not None and tag == group['entity_group'] and bi != 'B':
+            group['scores'].append(float(score))
+            group['end'] = char_end
+            continue
+        if group is not None:
+            entities.append(group)
+        group = {'entity_group': tag, 'scores': [float(score)], 'start': char_start, 'end': char_end}
+    if group is not None:
+        entities.append(group)
+    return [
+        {
+            'entity_group': entity['entity_group'],
+            'score': sum(entity['scores']) / len(entity['scores']),
+            'word': text[entity['start']:entity['end']],
+            'start': entity['start'],
+            'end': entity['end'],
+        }
+        for entity in entities if entity['entity_group'] != 'O'
+    ]
+
+def _aggregate_entities(task, texts, chunks, owners, outputs, id2label):
+    """Keep each token's prediction from the window that owns it, then group into entities."""
+    with stage_timer(f'aggregate.{task}') as stage:
+        stage['items'] = len(texts)
+        tokens = [[] for _ in texts]
+        for chunk, owner, probabilities in zip(chunks, owners, outputs):
+            own_start, own_end = chunk['owned']
+            for index in range(own_start, own_end):
+                position = chunk['prefix'] + index - chunk['start']
+                tokens[owner].append((probabilities[position], chunk['offsets'][index - chunk['start']]))
+        return [_group_entities(text, doc_tokens, id2label) for text, doc_tokens in zip(texts, tokens)]
+
+def _aggregate(task, texts, chunks, owners, outputs, config):
+    if MODEL_SPECS[task]['task'] == 'ner':
+        return _aggregate_entities(task, texts, chunks, owners, outputs, config.id2label)
+    return _aggregate_classes(task, texts, chunks, owners, outputs, config.id2label)
+
+def _run_tasks(texts_by_task, batch_size, fused=()):
+    """
+    Run several tasks, sharing as much work as the models allow.
+
+    Tasks served by the multi-task model share one tokenization and one
+    encoder pass per batch. The other tasks are grouped by tokenizer, so
+    models with the same vocabulary share one tokenization pass. Within a
+    group, every task runs over the texts any of them is missing.
+
+    Args:
+        texts_by_task (dict): task -> texts to compute it for.
+        batch_size (int): Number of token windows per forward pass.
+        fused (tuple): Tasks the multi-task model has heads for.
+
+    Returns:
+        dict: task -> {text: result}.
+    """
+    groups = {}
+    for task in texts_by_task:
+        spec = MODEL_SPECS[task]
+        groups.setdefault(MULTITASK_NAME if task in fused else spec.get('tokenizer', spec['model']), []).append(task)
+    results = {}
+    for group, tasks in groups.items():
+        texts = list(dict.fromkeys(text for task in tasks for text in texts_by_task[task]))
+        if group == MULTITASK_NAME:
+            model, tokenizer = get_model(MULTITASK_NAME), get_tokenizer(MULTITASK_NAME)
+            chunks, owners = _chunk_documents(MULTITASK_NAME, tokenizer, texts)
+            with stage_timer(f'model.{MULTITASK_NAME}') as stage:
+                outputs = _run_bucketed_heads(model, tokenizer, chunks, batch_size, tasks)
+                stage['items'] = len(texts)
+                stage['tokens'] = sum(len(chunk['input_ids']) for chunk in chunks)
+            for task in tasks:
+                results[task] = dict(zip(texts, _aggregate(task, texts, chunks, owners, outputs[task], model.configs[task])))
+            continue
+        tokenizer = get_tokenizer(tasks[0])
+        chunks, owners = _chunk_documents('+'.join(tasks), tokenizer, texts)
+        for task in tasks:
+            model = get_model(task)
+            with stage_timer(f'model.{task}') as stage:
+                outputs = _run_bucketed(model, tokenizer, chunks, batch_size)
+                stage['items'] = len(texts)
+                stage['tokens'] = sum(len(chunk['input_ids']) for chunk in chunks)
+            results[task] = dict(zip(texts, _aggregate(task, texts, chunks, owners, outputs, model.config)))
+    return results
+
+def analyse_batch(texts, tasks=TASKS, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Run several tasks over many documents in one scheduling pass.
+
+    With a multi-task model configured (ASAT_MULTITASK_MODEL or
+    model_registry.set_multitask) the tasks it has heads for run on one
+    shared encoder pass.
+
+    Args:
+        texts (list): Documents to analyse.
+        tasks (tuple): Any of 'sentiment', 'emotion' and 'ner'.
+        batch_size (int): Number of token windows per forward pass.
+
+    Returns:
+        list: For each document, a dict with a {label: probability} dict under
+        'sentiment' and 'emotion' and the entity list under 'ner', for the
+        requested tasks.
+
+    Raises:
+        Exception: Any model error; nothing is returned for the other tasks.
+    """
+    texts = list(texts)
+    results = _cached_tasks(tuple(tasks), texts, batch_size)
+    return [{task: results[task][i] for task in tasks} for i in range(len(texts))]
+
+def sentiment_scores_batch(texts, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Score the sentiment of many documents at once.
+
+    Args:
+        texts (list): Documents to analyse.
+        batch_size (int): Number of token windows per forward pass.
+
+    Returns:
+        list: A {label: probability} dict for each document.
+    """
+    return _cached_tasks(('sentiment',), list(texts), batch_size)['sentiment']
+
+def emotion_scores_batch(texts, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Score every emotion label for many documents at once.
+
+    Args:
+        texts (list): Documents to analyse.
+        batch_size (int): Number of token windows per forward pass.
+
+    Returns:
+        list: A {label: probability} dict for each document.
+    """
+    return _cached_tasks(('emotion',), list(texts), batch_size)['emotion']
+
+def analyse_sentiment_batch(texts, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Analyse the sentiment of many documents at once.
+
+    Args:
+        texts (list): Documents to analyse.
+        batch_size (int): Number of token windows per forward pass.
+
+    Returns:
+        list: The most likely sentiment label for each document.
+    """
+    texts = list(texts)
     try:
-        for chunk in chunk_text(text, sentiment_tokenizer):
-            result = nlp(chunk)[0]
-            sentiments.append(result['label'])
-        
-        # Aggregate results
-        sentiment_counts = {sentiment: sentiments.count(sentiment) for sentiment in set(sentiments)}
-        most_common_sentiment = max(sentiment_counts, key=sentiment_counts.get)
-        return most_common_sentiment
+        return [max(scores, key=scores.get) for scores in sentiment_scores_batch(texts, batch_size)]
     except Exception as e:
-        return f"Error in sentiment analysis: {str(e)}"
+        return [f"Error in sentiment analysis: {str(e)}"] * len(texts)
 
-def detect_emotion(text, threshold=0.05):
+def significant_emotions(scores, threshold=0.05):
+    """Emotions scoring above threshold, strongest first."""
+    emotions = [{'label': label, 'score': score} for label, score in scores.items() if score > threshold]
+    return sorted(emotions, key=lambda emotion: emotion['score'], reverse=True)
+
+def detect_emotion_batch(texts, threshold=0.05, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Detect emotions in many documents at once.
+
+    Args:
+        texts (list): Documents to analyse.
+        threshold (float): Minimum score for an emotion to be reported.
+        batch_size (int): Number of token windows per forward pass.
+
+    Returns:
+        list: The significant emotions in each document, strongest first.
+    """
+    texts = list(texts)
     try:
-        emotions = []
-        for chunk in chunk_text(text, emotion_tokenizer):
-            chunk_emotions = emotion_model(chunk)[0]
-            emotions.extend(chunk_emotions)
-        significant_emotions = [emotion for emotion in emotions if emotion['score'] > threshold]
-        return significant_emotions
+        return [significant_emotions(scores, threshold) for scores in emotion_scores_batch(texts, batch_size)]
     except Exception as e:
-        return f"Error in emotion detection: {str(e)}"
+        return [f"Error in emotion detection: {str(e)}"] * len(texts)
 
-def recognize_entities(text):
+def recognize_entities_batch(texts, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Recognise named entities in many documents at once.
+
+    Args:
+        texts (list): Documents to analyse.
+        batch_size (int): Number of token windows per forward pass.
+
+    Returns:
+        list: The entities found in each document, with character offsets.
+    """
+    texts = list(texts)
     try:
-        entities = []
-        for chunk in chunk_text(text, ner_tokenizer):
-            chunk_entities = ner_model(chunk)
-            entities.extend(chunk_entities)
-        return entities
+        return _cached_tasks(('ner',), texts, batch_size)['ner']
     except Exception as e:
-        return f"Error in entity recognition: {str(e)}"
+        return [f"Error in entity recognition: {str(e)}"] * len(texts)
+
+def analyse_sentiment(text):
+    return analyse_sentiment_batch([text])[0]
+
+def detect_emotion(text, threshold=0.05):
+    return detect_emotion_batch([text], threshold=threshold)[0]
+
+def recognize_entities(text):
+    return recognize_entities_batch([text])[0]
 
 def generate_pdf_report(data, filename="report.pdf"):
-    from reportlab.lib.pagesizes import letter
-    from reportlab.pdfgen import canvas
+    """
+    Write a PDF report for one analysis result or an iterable of per-document results.
+
+    See models.reports.write_pdf_report.
+    """
+    from models.reports import write_pdf_report
 
     try:
-        c = canvas.Canvas(filename, pagesize=letter)
-        width, height = letter
-        c.drawString(100, height - 40, "Sentiment Analysis Report")
-        c.drawString(100, height - 60, f"Sentiment: {data['sentiment']}")
-        c.drawString(100, height - 80, "Emotion Scores:")
-        y = height - 100
-        for emotion, score in data['emotions'].items():
-            c.drawString(100, y, f"{emotion}: {score:.2f}")
-            y -= 20
-        c.drawString(100, y, "Entities:")
-        y -= 20
-        for entity in data['entities']:
-            c.drawString(100, y, f"{entity['entity_group']}: {entity['word']} (score: {entity['score']:.2f})")
-            y -= 20
-        c.save()
+        write_pdf_report([data] if isinstance(data, dict) else data, filename)
     except Exception as e:
         print(f"Error in generating PDF report: {str(e)}")
 
 def generate_excel_report(data, filename="report.xlsx"):
-    import pandas as pd
+    """
+    Write an Excel report for one analysis result or an iterable of per-document results.
+
+    See models.reports.write_excel_report.
+    """
+    from models.reports import write_excel_report
 
     try:
-        writer = pd.ExcelWriter(filename, engine='openpyxl')
-        df = pd.DataFrame([data['emotions']])
-        df.to_excel(writer, index=False, sheet_name='Emotions')
-        entities_df = pd.DataFrame(data['entities'])
-        entities_df.to_excel(writer, index=False, sheet_name='Entities')
-        writer.save()
+        write_excel_report([data] if isinstance(data, dict) else data, filename)
     except Exception as e:
         print(f"Error in generating Excel report: {str(e)}")
 
-def track_sentiment_trends(texts, dates):
+def track_sentiment_trends(texts, dates, store=None):
+    """
+    Score texts and add them to a trend store.
+
+    Only the texts passed in are analysed; pass the same store on each call to
+    build up a history. Draw it with models.trends.plot_trend.
+
+    Returns:
+        SentimentTrendStore: The store, or an error message.
+    """
+    from models.trends import SentimentTrendStore
+
     try:
-        sentiments = []
-        for text in texts:
-            sentiment = analyse_sentiment(text)
-            sentiments.append(sentiment)
-        plt.figure(figsize=(10, 5))
-        plt.plot(dates, sentiments, marker='o')
-        plt.title('Sentiment Trends Over Time')
-        plt.xlabel('Date')
-        plt.ylabel('Sentiment')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.show()
+        store = store if store is not None else SentimentTrendStore()
+        store.add(texts, dates)
+        return store
     except Exception as e:
         return f"Error in tracking sentiment trends: {str(e)}"
@@ -0,0 +1,151 @@
+import threading
+import numpy as np
+import pandas as pd
+from models.sentiment_analyser import sentiment_scores_batch
+
+def signed_score(scores):
+    """Collapse {label: probability} into one number from -1 (negative) to 1 (positive)."""
+    return scores.get('POSITIVE', 0.0) - scores.get('NEGATIVE', 0.0)
+
+def downsample(x, y, max_points):
+    """
+    Reduce a series to about max_points points, keeping each bucket's min and max.
+
+    Unlike taking every n-th point, min/max bucketing keeps spikes visible.
+
+    Args:
+        x (ndarray): Sorted x values.
+        y (ndarray): y values.
+        max_points (int): Upper bound on the number of points returned.
+
+    Returns:
+        tuple: The selected (x, y) arrays, in x order.
+    """
+    if len(y) <= max_points:
+        return x, y
+    buckets = max(max_points // 2, 1)
+    size = len(y) // buckets
+    body = y[:buckets * size].reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    # The last point is always kept so the newest result stays on the plot.
+    picks = np.concatenate([offsets + body.argmin(axis=1), offsets + body.argmax(axis=1), [len(y) - 1]])
+    picks = np.unique(picks)
+    return x[picks], y[picks]
+
+class SentimentTrendStore:
+    """
+    Columnar store of scored texts for trend tracking.
+
+    Each add() scores only the texts passed to it and appends their date,
+    signed score and label; earlier texts are never re-analysed. Aggregates
+    are computed with vectorised pandas operations over the stored columns.
+    """
+
+    def __init__(self):
+        self._dates = []
+        self._scores = []
+        self._labels = []
+        self._frame = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(chunk) for chunk in self._scores)
+
+    def add(self, texts, dates, scores=None):
+        """
+        Score and store new texts.
+
+        Args:
+            texts (list): New texts.
+            dates (list): Their dates (strings or datetimes).
+            scores (list): Precomputed {label: probability} dicts, if any.
+        """
+        texts = list(texts)
+        if scores is None:
+            scores = sentiment_scores_batch(texts)
+        self.append(dates, [signed_score(score) for score in scores], [max(score, key=score.get) for score in scores])
+
+    def append(self, dates, values, labels):
+        """
+        Store already scored results, e.g. loaded from a ResultStore.
+
+        Args:
+            dates (list): Dates (strings or datetimes).
+            values (list): Signed scores, see signed_score.
+            labels (list): Sentiment labels.
+        """
+        if not len(values):
+            return
+        dates = pd.to_datetime(pd.Series(list(dates))).to_numpy(dtype='datetime64[ns]')
+        signed = np.asarray(values, dtype=np.float32)
+        labels = list(labels)
+        with self._lock:
+            self._dates.append(dates)
+            self._scores.append(signed)
+            self._labels.append(labels)
+            self._frame = None
+
+    def frame(self):
+        """All stored results as a date-sorted DataFrame with 'score' and 'label' columns."""
+        with self._lock:
+            if self._frame is None:
+                if self._scores:
+                    frame = pd.DataFrame({
+                        'date': np.concatenate(self._dates),
+                        'score': np.concatenate(self._scores),
+                        'label': pd.Categorical([label for chunk in self._labels for label in chunk]),
+                    })
+                else:
+                    frame = pd.DataFrame({'date': pd.Series(dtype='datetime64[ns]'),
+                                          'score': pd.Series(dtype=np.float32),
+                                          'label': pd.Categorical([])})
+                self._frame = frame.sort_values('date', kind='stable').set_index('date')
+            return self._frame
+
+    def resample(self, freq='D'):
+        """Mean score, count and share of each label per period ('h', 'D', 'W', ...)."""
+        frame = self.frame()
+        grouped = frame['score'].resample(freq).agg(['mean', 'count'])
+        shares = pd.get_dummies(frame['label']).resample(freq).mean()
+        return grouped.join(shares)
+
+    def rolling(self, window='7D'):
+        """Rolling mean score over a time window (e.g. '7D') or a number of results."""
+        return self.frame()['score'].rolling(window, min_periods=1).mean()
+
+    def auto_freq(self):
+        """A resampling period that gives a readable number of points for the stored span."""
+        frame = self.frame()
+        if len(frame) < 2:
+            return 'h'
+        span = frame.index[-1] - frame.index[0]
+        if span <= pd.Timedelta(days=2):
+            return 'h'
+        if span <= pd.Timedelta(days=90):
+            return 'D'
+        return 'W'
+
+def plot_trend(ax, store, freq=None, window='7D', max_points=2000):
+    """
+    Draw stored scores, their rolling mean and per-period means on a matplotlib axis.
+
+    Raw points and the rolling line are downsampled to max_points, so very
+    large stores still draw quickly.
+    """
+    frame = store.frame()
+    ax.set_title('Sentiment Trends Over Time')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Sentiment score (negative to positive)')
+    ax.set_ylim(-1.05, 1.05)
+    if frame.empty:
+        return
+    x = frame.index.to_numpy()
+    points_x, points_y = downsample(x, frame['score'].to_numpy(), max_points)
+    ax.plot(points_x, points_y, '.', alpha=0.3, label='Scores')
+    rolling = store.rolling(window)
+    rolling_x, rolling_y = downsample(x, rolling.to_numpy(), max_points)
+    ax.plot(rolling_x, rolling_y, label=f'Rolling mean ({window})')
+    periods = store.resample(freq or store.auto_freq())['mean'].dropna()
+    ax.plot(periods.index, periods.to_numpy(), marker='o', label='Period mean')
+    ax.legend(loc='lower left')
+    ax.figure.autofmt_xdate()
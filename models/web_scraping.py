@@ -1,16 +1,189 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
 
-def fetch_amazon_reviews(url):
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
-    response = requests.get(url, headers=headers)
-    soup = BeautifulSoup(response.content, 'html.parser')
-    reviews = []
+try:
+    import lxml  # noqa: F401
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
 
-    for review in soup.find_all('div', {'data-hook': 'review'}):
-        review_text = review.find('span', {'data-hook': 'review-body'}).text.strip()
-        reviews.append(review_text)
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Only review bodies are turned into tree nodes; the rest of the page is skipped while parsing.
+REVIEW_BODIES = SoupStrainer('span', attrs={'data-hook': 'review-body'})
 
-    return reviews
+class RateLimiter:
+    """Spaces requests at least 1 / rate seconds apart across all threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+class HttpCache:
+    """
+    On-disk store of fetched pages for conditional requests.
+
+    Each URL keeps its body and its ETag / Last-Modified validators; a 304
+    reply is then answered from disk.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+    def load(self, url):
+        try:
+            with open(self._path(url), 'r') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, response):
+        if not (response.headers.get('ETag') or response.headers.get('Last-Modified')):
+            return
+        entry = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'body': response.text,
+        }
+        path = self._path(url)
+        with open(path + '.tmp', 'w') as file:
+            json.dump(entry, file)
+        os.replace(path + '.tmp', path)
+
+def make_session(pool_size=8):
+    """A session whose connection pool is large enough for pool_size threads."""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def page_url(url, page, page_param='pageNumber'):
+    parts = urlparse(url)
+    query = dict(parse_qsl(parts.query))
+    query[page_param] = str(page)
+    return urlunparse(parts._replace(query=urlencode(query)))
+
+def fetch_page(session, url, timeout=10, retries=3, backoff=0.5, rate_limiter=None, cache=None):
+    """
+    GET one page, retrying timeouts, connection errors and retryable statuses.
+
+    Waits backoff * 2**attempt between attempts (or the server's Retry-After).
+
+    Returns:
+        str: The page HTML.
+    """
+    entry = cache.load(url) if cache else None
+    headers = cache.conditional_headers(entry) if cache else {}
+    for attempt in range(retries + 1):
+        if rate_limiter is not None:
+            rate_limiter.wait()
+        delay = backoff * 2 ** attempt
+        try:
+            response = session.get(url, headers=headers, timeout=timeout)
+            if response.status_code == 304 and entry:
+                return entry['body']
+            if response.status_code not in RETRY_STATUSES:
+                response.raise_for_status()
+                if cache:
+                    cache.store(url, response)
+                return response.text
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                delay = int(retry_after)
+            if attempt == retries:
+                response.raise_for_status()
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+        time.sleep(delay)
+
+def parse_reviews(html):
+    soup = BeautifulSoup(html, PARSER, parse_only=REVIEW_BODIES)
+    return [review.get_text().strip() for review in soup.find_all('span', {'data-hook': 'review-body'})]
+
+def iter_review_pages(url, max_pages=10, workers=4, rate=2.0, timeout=10, retries=3, backoff=0.5,
+                      cache_dir=None, session=None, page_param='pageNumber'):
+    """
+    Crawl review pages concurrently and yield each page as soon as it is parsed.
+
+    At most `workers` pages are in flight at once. Crawling stops at
+    max_pages or after the first page that has no reviews.
+
+    Args:
+        url (str): First review page.
+        max_pages (int): Maximum number of pages to fetch.
+        workers (int): Concurrent requests.
+        rate (float): Maximum requests per second; None for no limit.
+        timeout (float): Seconds to wait for each response.
+        retries (int): Extra attempts for failed requests.
+        backoff (float): Base delay between attempts, doubled each time.
+        cache_dir (str): Directory for the conditional-request cache.
+        session (Session): Session to use; a pooled one is made by default.
+        page_param (str): Query parameter carrying the page number.
+
+    Yields:
+        tuple: (page number, list of review texts), in completion order.
+    """
+    session = session or make_session(workers)
+    rate_limiter = RateLimiter(rate)
+    cache = HttpCache(cache_dir) if cache_dir else None
+
+    def fetch(page):
+        target = url if page == 1 else page_url(url, page, page_param)
+        return page, parse_reviews(fetch_page(session, target, timeout, retries, backoff, rate_limiter, cache))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        next_page = 1
+        in_flight = set()
+        exhausted = False
+        while in_flight or (not exhausted and next_page <= max_pages):
+            while not exhausted and next_page <= max_pages and len(in_flight) < workers:
+                in_flight.add(executor.submit(fetch, next_page))
+                next_page += 1
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                page, reviews = future.result()
+                if not reviews:
+                    exhausted = True
+                yield page, reviews
+
+def iter_amazon_reviews(url, **kwargs):
+    """Yield review texts as their pages arrive; see iter_review_pages for options."""
+    for _, reviews in iter_review_pages(url, **kwargs):
+        yield from reviews
+
+def fetch_amazon_reviews(url, max_pages=1, **kwargs):
+    return list(iter_amazon_reviews(url, max_pages=max_pages, **kwargs))
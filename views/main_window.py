@@ -1,19 +1,24 @@
+from array import array
 from PyQt5.QtWidgets import QMainWindow, QPushButton, QTextEdit, QFileDialog, QLabel, QVBoxLayout, QWidget, QCheckBox, QLineEdit
 from PyQt5.QtCore import Qt
-from models.sentiment_analyser import analyse_sentiment, detect_emotion, recognize_entities, generate_pdf_report, generate_excel_report, track_sentiment_trends
-from models.web_scraping import fetch_amazon_reviews
+from models.sentiment_analyser import analyse_sentiment, detect_emotion, recognize_entities
+from models.web_scraping import iter_review_pages
+from controllers.inference_service import InferenceService
+from models.incremental import IncrementalAnalyser
+from models.batch_runner import analyse_records, result_provenance
+from models.process_pool import parallel_analyse, shutdown_pool
+from models.data_loader import iter_documents
+from models.dedup import Deduplicator, analyse_deduplicated
+from models.preprocessing import DEFAULT_OPTIONS, ensure_nltk_data, preprocess_text
+from models.profiling import format_stats
+from models.reports import write_excel_report, write_pdf_report
+from models.result_store import ResultStore, sentiment_value
+from models.trends import SentimentTrendStore
+from models.model_registry import model_stats, multitask_tasks
 from .mpl_widget import MplWidget
 from datetime import datetime
-import re
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
-import contractions
 
-nltk.download('stopwords')
-nltk.download('punkt')
-nltk.download('wordnet')
+ensure_nltk_data()
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -110,6 +115,10 @@ class MainWindow(QMainWindow):
         self.save_excel_button.clicked.connect(self.on_save_excel_report_clicked)
         self.layout.addWidget(self.save_excel_button)
 
+        self.stats_button = QPushButton('Show Performance Stats', self)
+        self.stats_button.clicked.connect(self.on_show_stats_clicked)
+        self.layout.addWidget(self.stats_button)
+
         self.result_label = QLabel('Sentiment Result:', self)
         self.layout.addWidget(self.result_label)
 
@@ -119,6 +128,9 @@ class MainWindow(QMainWindow):
         self.entity_label = QLabel('Entity Recognition Result:', self)
         self.layout.addWidget(self.entity_label)
 
+        self.stats_label = QLabel('', self)
+        self.layout.addWidget(self.stats_label)
+
         self.mpl_widget = MplWidget(self)
         self.layout.addWidget(self.mpl_widget)
 
@@ -130,31 +142,32 @@ class MainWindow(QMainWindow):
         self.current_emotions = None
         self.current_entities = None
         self.real_time_analysis_enabled = False
-        self.texts = []
-        self.dates = []
-
-        self.preprocessing_options = {
-            'remove_punctuation': False,
-            'convert_to_lowercase': False,
-            'remove_stopwords': False,
-            'remove_urls': False,
-            'remove_mentions': False,
-            'remove_hashtags': False,
-            'remove_numbers': False,
-            'expand_contractions': False,
-            'remove_whitespace': False,
-            'lemmatization': False
-        }
+        self.result_store = ResultStore()
+        self.trend_store = SentimentTrendStore()
+        # Earlier sessions' results come from the store's date index, not from re-running the model.
+        self.trend_store.append(*self.result_store.sentiment_series())
+        # Stored document ids of the last multi-file analysis or review fetch; reports stream them from the store.
+        self.report_ids = array('q')
+
+        self.inference = InferenceService(self)
+        self.inference.result_ready.connect(self.on_inference_result)
+        self.inference.error.connect(self.on_inference_error)
+        # Real-time analysis re-scores only the paragraphs that changed since the last edit.
+        self.incremental = IncrementalAnalyser(preprocess=self.preprocess_text)
+
+        self.preprocessing_options = dict(DEFAULT_OPTIONS)
 
     def on_text_changed(self):
         if self.real_time_analysis_enabled:
             text = self.text_edit.toPlainText()
-            self.perform_real_time_analysis(text)
+            self.inference.submit_debounced('analysis', lambda: self.incremental.update_stages(text))
 
     def on_real_time_checkbox_changed(self, state):
         self.real_time_analysis_enabled = state == Qt.Checked
         if self.real_time_analysis_enabled:
             self.on_text_changed()
+        else:
+            self.inference.cancel('analysis')
 
     def on_preprocessing_option_changed(self, state):
         sender = self.sender()
@@ -180,37 +193,53 @@ class MainWindow(QMainWindow):
             self.preprocessing_options['lemmatization'] = state == Qt.Checked
 
     def preprocess_text(self, text):
-        if self.preprocessing_options['remove_urls']:
-            text = re.sub(r'http\S+|www\S+|https\S+', '', text, flags=re.MULTILINE)
-        if self.preprocessing_options['remove_mentions']:
-            text = re.sub(r'@\w+', '', text)
-        if self.preprocessing_options['remove_hashtags']:
-            text = re.sub(r'#\w+', '', text)
-        if self.preprocessing_options['remove_numbers']:
-            text = re.sub(r'\d+', '', text)
-        if self.preprocessing_options['expand_contractions']:
-            text = contractions.fix(text)
-        if self.preprocessing_options['remove_punctuation']:
-            text = re.sub(r'[^\w\s]', '', text)
-        if self.preprocessing_options['convert_to_lowercase']:
-            text = text.lower()
-        if self.preprocessing_options['remove_stopwords']:
-            stop_words = set(stopwords.words('english'))
-            text = ' '.join([word for word in text.split() if word.lower() not in stop_words])
-        if self.preprocessing_options['remove_whitespace']:
-            text = ' '.join(text.split())
-        if self.preprocessing_options['lemmatization']:
-            lemmatizer = WordNetLemmatizer()
-            text = ' '.join([lemmatizer.lemmatize(word) for word in word_tokenize(text)])
-        return text
+        return preprocess_text(text, self.preprocessing_options)
 
-    def perform_real_time_analysis(self, text):
+    def analysis_stages(self, text):
+        """Runs on a worker thread; yields each model's result as soon as it is ready."""
         text = self.preprocess_text(text)
-        sentiment = analyse_sentiment(text)
+        if multitask_tasks():
+            # A multi-task model answers everything from one encoder pass, so results arrive together.
+            record = analyse_records([text])[0]
+            yield 'sentiment', record['sentiment']
+            yield 'emotions', record['emotions']
+            yield 'entities', record['entities']
+            return
+        yield 'sentiment', analyse_sentiment(text)
+        yield 'emotions', detect_emotion(text)
+        yield 'entities', recognize_entities(text)
+
+    def perform_real_time_analysis(self, text):
+        self.inference.submit('analysis', lambda: self.analysis_stages(text))
+
+    def on_inference_result(self, channel, kind, result):
+        if kind == 'sentiment':
+            self.show_sentiment(result)
+        elif kind == 'emotions':
+            self.show_emotions(result)
+        elif kind == 'entities':
+            self.show_entities(result)
+        elif kind == 'files':
+            self.text_edit.append(result)
+        elif kind == 'reviews':
+            # Pages arrive one at a time; appending re-triggers (debounced) real-time analysis.
+            self.text_edit.append("\n".join(result))
+        elif kind in ('report', 'status'):
+            self.result_label.setText(result)
+        elif kind == 'trends':
+            if isinstance(result, str):
+                self.result_label.setText(result)
+            else:
+                self.mpl_widget.plot_trend(result)
+
+    def on_inference_error(self, channel, message):
+        self.result_label.setText(f"Error in {channel}: {message}")
+
+    def show_sentiment(self, sentiment):
         self.result_label.setText(f"Sentiment Result: {sentiment}")
         self.current_sentiment = sentiment
 
-        emotions = detect_emotion(text)
+    def show_emotions(self, emotions):
         if isinstance(emotions, str):
             self.emotion_label.setText(emotions)
         else:
@@ -218,7 +247,7 @@ class MainWindow(QMainWindow):
             self.emotion_label.setText(f"Emotion Detection Result:\n{emotion_result}")
             self.current_emotions = {emotion['label']: emotion['score'] for emotion in emotions}
 
-        entities = recognize_entities(text)
+    def show_entities(self, entities):
         if isinstance(entities, str):
             self.entity_label.setText(entities)
         else:
@@ -232,45 +261,34 @@ class MainWindow(QMainWindow):
 
     def on_detect_emotion_clicked(self):
         text = self.text_edit.toPlainText()
-        text = self.preprocess_text(text)
-        emotions = detect_emotion(text)
-        if isinstance(emotions, str):
-            self.emotion_label.setText(emotions)
-        else:
-            emotion_result = "\n".join([f"{emotion['label']}: {emotion['score']:.2f}" for emotion in emotions])
-            self.emotion_label.setText(f"Emotion Detection Result:\n{emotion_result}")
-            self.current_emotions = {emotion['label']: emotion['score'] for emotion in emotions}
+        self.inference.submit('emotions', lambda: [('emotions', detect_emotion(self.preprocess_text(text)))])
 
     def on_recognize_entities_clicked(self):
         text = self.text_edit.toPlainText()
-        text = self.preprocess_text(text)
-        entities = recognize_entities(text)
-        if isinstance(entities, str):
-            self.entity_label.setText(entities)
-        else:
-            entity_result = "\n".join([f"{entity['entity_group']}: {entity['word']} (score: {entity['score']:.2f})" for entity in entities])
-            self.entity_label.setText(f"Entity Recognition Result:\n{entity_result}")
-            self.current_entities = [{'entity_group': entity['entity_group'], 'word': entity['word'], 'score': entity['score']} for entity in entities]
-
-    def on_save_pdf_report_clicked(self):
-        data = {
+        self.inference.submit('entities', lambda: [('entities', recognize_entities(self.preprocess_text(text)))])
+
+    def report_records(self):
+        """Per-document results from the last multi-file analysis, streamed from the store, else the current analysis."""
+        if self.report_ids:
+            return self.result_store.iter_documents(self.report_ids, count=len(self.report_ids))
+        return [{
+            'text': self.text_edit.toPlainText(),
             'sentiment': self.current_sentiment,
             'emotions': self.current_emotions,
             'entities': self.current_entities
-        }
+        }]
+
+    def on_save_pdf_report_clicked(self):
+        records = self.report_records()
         fname, _ = QFileDialog.getSaveFileName(self, 'Save PDF Report', '', "PDF files (*.pdf)")
         if fname:
-            generate_pdf_report(data, fname)
+            self.inference.submit('pdf_report', lambda: [('report', f"Saved report on {write_pdf_report(records, fname)} documents to {fname}")])
 
     def on_save_excel_report_clicked(self):
-        data = {
-            'sentiment': self.current_sentiment,
-            'emotions': self.current_emotions,
-            'entities': self.current_entities
-        }
+        records = self.report_records()
         fname, _ = QFileDialog.getSaveFileName(self, 'Save Excel Report', '', "Excel files (*.xlsx)")
         if fname:
-            generate_excel_report(data, fname)
+            self.inference.submit('excel_report', lambda: [('report', f"Saved report on {write_excel_report(records, fname)} documents to {fname}")])
 
     def load_file(self):
         fname, _ = QFileDialog.getOpenFileName(self, 'Open file', '', "Text files (*.txt);;CSV files (*.csv)")
@@ -282,29 +300,76 @@ class MainWindow(QMainWindow):
                     self.perform_real_time_analysis(data)
 
     def load_multiple_files(self):
-        files, _ = QFileDialog.getOpenFileNames(self, 'Open files', '', "Text files (*.txt);;CSV files (*.csv)")
+        files, _ = QFileDialog.getOpenFileNames(self, 'Open files', '', "Text files (*.txt);;CSV files (*.csv);;All data files (*.csv *.jsonl *.json *.parquet *.gz)")
         if files:
-            results = []
-            for fname in files:
-                with open(fname, 'r') as file:
-                    data = file.read()
-                    sentiment = analyse_sentiment(data)
-                    results.append((fname, sentiment))
-            result_text = "\n".join(f"{fname}: {sentiment}" for fname, sentiment in results)
-            self.text_edit.setText(result_text)
+            self.text_edit.clear()
+            self.report_ids = array('q')
+            self.inference.submit('files', lambda: self.analyse_files(files))
+
+    def analyse_files(self, files):
+        """Runs on a worker thread; yields each batch of results as soon as it is ready."""
+        deduplicator = Deduplicator()
+        score = lambda texts: parallel_analyse(texts, tasks=('sentiment',))
+        analyse = lambda texts: analyse_deduplicated(texts, score, deduplicator)
+        provenance = result_provenance()
+        reused = 0
+        for names, documents in iter_documents(files):
+            # Documents already in the store keep their stored result and are not stored again.
+            records, stored = self.result_store.analyse_new(documents, analyse, provenance, source=names)
+            reused += stored
+            self.trend_store.append([datetime.now()] * len(records), [sentiment_value(record) for record in records],
+                                    [record['sentiment'] for record in records])
+            self.report_ids.extend(record['id'] for record in records)
+            yield 'files', "\n".join(f"{name}: {record['sentiment']}" for name, record in zip(names, records))
+        stats = deduplicator.stats()
+        yield 'status', (f"{reused} documents were already stored; analysed {stats['analysed']} of the other"
+                         f" {stats['documents']}, {stats['saved']:.0%} were duplicates")
 
     def on_track_trends_clicked(self):
-        texts = self.texts
-        dates = self.dates
-        texts.append(self.text_edit.toPlainText())
-        dates.append(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-        track_sentiment_trends(texts, dates)
+        text = self.text_edit.toPlainText()
+        date = datetime.now()
+        self.inference.submit('trends', lambda: [('trends', self.track_trends(text, date))])
+
+    def track_trends(self, text, date):
+        """Runs on a worker thread; only the current text is scored, earlier results stay in the stores."""
+        record = analyse_records([text], tasks=('sentiment',))[0]
+        if record['sentiment_score'] is None:
+            return record['sentiment']
+        self.result_store.add_many([text], [record], source='trends', dates=[date], provenance=result_provenance())
+        self.trend_store.append([date], [sentiment_value(record)], [record['sentiment']])
+        return self.trend_store
 
     def on_fetch_reviews_clicked(self):
         url = self.url_input.text()
         if 'amazon' in url:
-            reviews = fetch_amazon_reviews(url)
-            self.text_edit.setText("\n".join(reviews))
+            self.text_edit.clear()
+            self.report_ids = array('q')
+            self.inference.submit('reviews', lambda: self.fetch_reviews(url))
+
+    def fetch_reviews(self, url):
+        """Runs on a worker thread; every review is kept, but repeated and syndicated ones are scored once."""
+        deduplicator = Deduplicator()
+        score = lambda texts: parallel_analyse(texts, tasks=('sentiment',))
+        analyse = lambda texts: analyse_deduplicated(texts, score, deduplicator)
+        provenance = result_provenance()
+        reused = 0
+        for _, reviews in iter_review_pages(url):
+            if not reviews:
+                continue
+            records, stored = self.result_store.analyse_new(reviews, analyse, provenance, source=url)
+            reused += stored
+            self.report_ids.extend(record['id'] for record in records)
+            yield 'reviews', reviews
+        stats = deduplicator.stats()
+        yield 'status', (f"Fetched {stats['documents'] + reused} reviews; {reused} were already stored and"
+                         f" {stats['documents'] - stats['analysed']} duplicates reused an earlier review's result")
+
+    def on_show_stats_clicked(self):
+        models = "\n".join(
+            f"{name} ({stats['backend']}): loaded in {stats['load_seconds']:.1f}s, {stats['size_bytes'] / 2**20:.0f} MB"
+            for name, stats in model_stats().items() if stats['loaded']
+        )
+        self.stats_label.setText(f"Stage timings:\n{format_stats()}\n\nModels:\n{models}")
 
     def save_results(self):
         fname, _ = QFileDialog.getSaveFileName(self, 'Save file', '', "Text files (*.txt)")
@@ -315,3 +380,9 @@ class MainWindow(QMainWindow):
 
     def update_plot(self, data):
         self.mpl_widget.plot(data)
+
+    def closeEvent(self, event):
+        self.inference.shutdown()
+        shutdown_pool()
+        self.result_store.close()
+        super().closeEvent(event)
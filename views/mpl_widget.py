@@ -1,6 +1,7 @@
 from PyQt5.QtWidgets import QVBoxLayout, QWidget
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from models.trends import plot_trend
 
 class MplWidget(QWidget):
     def __init__(self, parent=None):
@@ -18,3 +19,10 @@ class MplWidget(QWidget):
         ax.set_ylabel('Counts')
         ax.set_title('Sentiment Analysis Results')
         self.canvas.draw()
+
+    def plot_trend(self, store):
+        self.figure.clear()
+        ax = self.figure.add_subplot(111)
+        plot_trend(ax, store)
+        self.figure.tight_layout()
+        self.canvas.draw_idle()